@@ -2,20 +2,36 @@ from pydantic import BaseModel
 class CustomRequest(BaseModel):
     selected_stocks: list[str]
     anchor_stock: str
+    hedge_method: str = "ols"   # "ols" (static beta) or "kalman" (dynamic beta)
+    bootstrap: int = 0          # resamples of the backtest (0 = off)
+    bootstrap_method: str = "trades"
+    trade_format: str = "rows"  # "rows" (one object per trade) or "columns"
 from fastapi import FastAPI, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
 import numpy as np
-import os, glob
-from backend.pair_trading.scripts.pair_selection import get_top_n_pairs,find_best_pair_within_subset
+import os
+import json
+from backend.pair_trading.scripts.pair_selection import find_anchor_pairs
 from backend.pair_trading.scripts.cointegration_utils import (
     find_cointegrated_pairs,
     get_hedge_ratio,
-    calculate_spread,
+    calculate_kalman_spread,
     calculate_rolling_mean_std,
     calculate_zscore,
     generate_signals,
 )
+from backend.pair_trading.scripts.basket_search import find_cointegrated_baskets, DEFAULT_BUDGET
+from backend.pair_trading.scripts.price_store import get_price_panel
+from backend.pair_trading.scripts.rolling_kernel import rolling_pair_stats
+from backend.pair_trading.scripts.signal_engine import signal_codes
+from backend.pair_trading.scripts.backtest_engine import backtest_signals
+from backend.pair_trading.scripts.bootstrap import bootstrap_backtest, BOOTSTRAP_METHODS
+from backend.pair_trading.scripts.trade_records import pair_trade_records, records_to_rows, records_to_json
+from backend.pair_trading.scripts.snapshot import default_snapshot_path
+from backend.pair_trading.scripts.pvalue_cache import configure_pvalue_cache
 
 app = FastAPI()
 
@@ -28,6 +44,19 @@ app.add_middleware(
 )
 
 DATA_DIR = "backend/pair_trading/data"
+SNAPSHOT_FILE = default_snapshot_path(DATA_DIR)
+PVALUE_CACHE_FILE = os.path.join(DATA_DIR, "pair_cache.sqlite")
+
+configure_pvalue_cache(PVALUE_CACHE_FILE)
+
+# static OLS beta, or a Kalman-filtered beta that adapts bar by bar
+HEDGE_METHODS = ("ols", "kalman")
+MAX_BOOTSTRAP = 100_000
+# backtest_results as a list of trade objects, or as one array per field
+TRADE_FORMATS = ("rows", "columns")
+# /basket-mode limits: Johansen tests per request and pre-screen neighbours
+MAX_BASKET_BUDGET = 5000
+MAX_BASKET_TOP_K = 20
 
 # ✅ Clean values so JSON does not break
 def clean_series(series):
@@ -39,33 +68,83 @@ def clean_series(series):
     )
 
 
-@app.get("/automatic-mode")
-def automatic_mode():
-    all_files = glob.glob(os.path.join(DATA_DIR, "*.csv"))
-    dfs = []
-
-    for f in all_files:
-        df = pd.read_csv(f)
-        df.columns = df.columns.str.strip().str.lower()
-        if "date" not in df.columns or "close" not in df.columns:
-            continue
-
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date"]).set_index("date")
-
-        stock_name = os.path.basename(f).replace("Quote-Equity-", "").replace(".csv", "")
-        stock_name = stock_name.split("-EQ")[0]
+def pair_analytics(y, x, hedge_method="ols", window=20):
+    """
+    Hedge ratio, spread, rolling mean, z-score and rolling correlation of a
+    pair, all rolling statistics from one fused pass starting on day 1
+    (min_periods=1). With hedge_method="kalman" the spread and z-score come
+    from the Kalman filter and the hedge ratio is its latest beta.
+    """
+    if hedge_method == "kalman":
+        spread, kalman_z, hedge_ratios = calculate_kalman_spread(y, x)
+        hedge_ratio = hedge_ratios.iloc[-1]
+        stats = rolling_pair_stats(y.values, x.values, spread=spread.values, window=window, min_periods=1)
+        zscore = kalman_z
+    else:
+        hedge_ratio = get_hedge_ratio(y, x)
+        stats = rolling_pair_stats(y.values, x.values, hedge_ratio, window=window, min_periods=1)
+        spread = pd.Series(stats["spread"], index=y.index)
+        zscore = pd.Series(stats["zscore"], index=y.index)
+
+    rolling_mean = pd.Series(stats["mean"], index=y.index)
+    rolling_corr = pd.Series(stats["corr"], index=y.index)
+    return hedge_ratio, spread, rolling_mean, zscore, rolling_corr
+
+
+def option_error(resamples, method, trade_format):
+    if trade_format not in TRADE_FORMATS:
+        return {"status": "error", "message": f"Unknown trade_format: {trade_format}"}
+    if method not in BOOTSTRAP_METHODS:
+        return {"status": "error", "message": f"Unknown bootstrap_method: {method}"}
+    if not 0 <= resamples <= MAX_BOOTSTRAP:
+        return {"status": "error", "message": f"bootstrap must be between 0 and {MAX_BOOTSTRAP}"}
+    return None
+
+
+def backtest_bootstrap(y, x, signals, resamples, method="trades"):
+    """
+    Bootstrap distribution of a pair backtest: resampled trade PnLs, or
+    with method="blocks" block-resampled daily PnL. Both come from the
+    mark-to-market PnL of backtest_signals, so the two methods describe the
+    same trades.
+    """
+    result = backtest_signals(signal_codes(signals), np.asarray(y, dtype=float),
+                              np.asarray(x, dtype=float))
+    if method == "blocks":
+        return bootstrap_backtest(daily_pnl=result["pnl"], method="blocks", n_resamples=resamples)
+    return bootstrap_backtest(trade_pnl=result["trade_pnl"], n_resamples=resamples)
+
+
+def pair_response(response, records, stock1, stock2, trade_format="rows"):
+    """
+    Attach the backtest trades to a mode response. With trade_format=
+    "columns" the trades are encoded column by column (records_to_json)
+    and spliced into the already-encoded rest of the response.
+    """
+    if trade_format == "rows":
+        response["backtest_results"] = records_to_rows(records, stock1, stock2)
+        return response
+    body = json.dumps(jsonable_encoder(response), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":"))
+    content = body[:-1] + ',"backtest_results":' + records_to_json(records, stock1, stock2) + "}"
+    return Response(content=content, media_type="application/json")
 
-        df = df[["close"]].rename(columns={"close": stock_name})
-        df[stock_name] = pd.to_numeric(df[stock_name].astype(str).str.replace(",", ""), errors="coerce")
-        dfs.append(df)
 
-    if not dfs:
+@app.get("/automatic-mode")
+def automatic_mode(hedge_method: str = "ols", bootstrap: int = 0, bootstrap_method: str = "trades",
+                   trade_format: str = "rows"):
+    if hedge_method not in HEDGE_METHODS:
+        return {"status": "error", "message": f"Unknown hedge_method: {hedge_method}"}
+    error = option_error(bootstrap, bootstrap_method, trade_format)
+    if error:
+        return error
+
+    combined_df = get_price_panel(DATA_DIR, snapshot_path=SNAPSHOT_FILE)
+    if combined_df is None:
         return {"status": "error", "message": "No valid CSVs found"}
 
-    combined_df = pd.concat(dfs, axis=1).ffill()
-
-    pairs, _ = find_cointegrated_pairs(combined_df, significance=0.05)
+    pairs, _ = find_cointegrated_pairs(combined_df, significance=0.05, engine="batched",
+                                      use_cache=True)
     if not pairs:
         return {"status": "error", "message": "No pairs found"}
 
@@ -76,19 +155,7 @@ def automatic_mode():
     df_pair = pd.concat([y, x], axis=1).dropna()
     y_clean, x_clean = df_pair.iloc[:, 0], df_pair.iloc[:, 1]
 
-    y_norm = (y_clean - y_clean.mean()) / y_clean.std()
-    x_norm = (x_clean - x_clean.mean()) / x_clean.std()
-
-    # ✅ min_periods fix
-    rolling_corr = y_norm.rolling(window=20, min_periods=1).corr(x_norm)
-
-    hedge_ratio = get_hedge_ratio(y_clean, x_clean)
-    spread = calculate_spread(y_clean, x_clean, hedge_ratio)
-
-    # ✅ rolling start from day 1
-    rolling_mean = spread.rolling(window=20, min_periods=1).mean()
-    rolling_std = spread.rolling(window=20, min_periods=1).std()
-    zscore = (spread - rolling_mean) / rolling_std
+    hedge_ratio, spread, rolling_mean, zscore, rolling_corr = pair_analytics(y_clean, x_clean, hedge_method)
 
     signals = generate_signals(spread, zscore)
     # --- Adaptive recommendation logic (same as Custom Mode) ---
@@ -103,24 +170,17 @@ def automatic_mode():
         trade_action = "No trade suggestion"
 
 
-    from backend.pair_trading.scripts.cointegration_utils import backtest_pair
-
-    # ✅ Run backtest
-    trade_results = backtest_pair(
+    # ✅ Run backtest (compact trade records, see trade_records)
+    records = pair_trade_records(
     y_clean.values,
     x_clean.values,
     signals,
     df_pair.index,   # ✅ pass dates
-    stock1,
-    stock2
 )
 
-    # ✅ Convert P&L result to JSON-safe structure
-    backtest_output = trade_results
-
     idx = df_pair.index
 
-    return {
+    response = {
         "status": "ok",
         "best_pair": [stock1, stock2],
         "hedge_ratio": float(hedge_ratio),
@@ -134,8 +194,11 @@ def automatic_mode():
         "stock1_prices": y_clean.reindex(idx).tolist(),
         "stock2_prices": x_clean.reindex(idx).tolist(),
         "signals": [(None if s is None else str(s)) for s in signals],
-        "backtest_results": backtest_output,
     }
+    if bootstrap:
+        response["backtest_bootstrap"] = backtest_bootstrap(
+            y_clean.values, x_clean.values, signals, bootstrap, bootstrap_method)
+    return pair_response(response, records, stock1, stock2, trade_format)
 
 
 @app.get("/dashboard")
@@ -160,10 +223,44 @@ def dashboard():
     }
 
 
+@app.get("/basket-mode")
+def basket_mode(min_size: int = 3, max_size: int = 5, top_k: int = 8,
+                budget: int = DEFAULT_BUDGET, limit: int = 10):
+    combined_df = get_price_panel(DATA_DIR, snapshot_path=SNAPSHOT_FILE)
+    if combined_df is None:
+        return {"status": "error", "message": "No valid CSVs found"}
+    if not 2 <= min_size <= max_size <= 12:
+        return {"status": "error", "message": "Basket sizes must satisfy 2 <= min_size <= max_size <= 12"}
+    if not 1 <= budget <= MAX_BASKET_BUDGET:
+        return {"status": "error", "message": f"budget must be between 1 and {MAX_BASKET_BUDGET}"}
+    if not 1 <= top_k <= MAX_BASKET_TOP_K:
+        return {"status": "error", "message": f"top_k must be between 1 and {MAX_BASKET_TOP_K}"}
+    if limit < 1:
+        return {"status": "error", "message": "limit must be at least 1"}
+
+    baskets, report = find_cointegrated_baskets(
+        combined_df, sizes=range(min_size, max_size + 1), top_k=top_k,
+        budget=budget, workers=os.cpu_count(),
+    )
+    if not baskets:
+        return {"status": "error", "message": "No cointegrated baskets found", "report": report}
+
+    return {
+        "status": "ok",
+        "baskets": baskets[:limit],
+        "report": report,
+    }
+
+
 @app.post("/custom-mode")
 async def custom_mode(body: CustomRequest):
     selected_stocks = body.selected_stocks
     anchor = body.anchor_stock
+    if body.hedge_method not in HEDGE_METHODS:
+        return {"status": "error", "message": f"Unknown hedge_method: {body.hedge_method}"}
+    error = option_error(body.bootstrap, body.bootstrap_method, body.trade_format)
+    if error:
+        return error
 
     if not selected_stocks or len(selected_stocks) < 2:
         return {"status": "error", "message": "Select at least 2 stocks."}
@@ -171,56 +268,33 @@ async def custom_mode(body: CustomRequest):
     if anchor not in selected_stocks:
         return {"status": "error", "message": "Anchor stock must be selected in the list."}
 
-    # Load all CSV files
-    all_files = glob.glob(os.path.join(DATA_DIR, "*.csv"))
-    dfs = []
-
-    for f in all_files:
-        df = pd.read_csv(f)
-        df.columns = df.columns.str.strip().str.lower()
-        if "date" not in df.columns or "close" not in df.columns:
-            continue
-
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date"]).set_index("date")
-
-        stock_name = os.path.basename(f).replace("Quote-Equity-", "").replace(".csv", "")
-        stock_name = stock_name.split("-EQ")[0]
-
-        df = df[["close"]].rename(columns={"close": stock_name})
-        df[stock_name] = pd.to_numeric(df[stock_name].astype(str).str.replace(",", ""), errors="coerce")
-        dfs.append(df)
-
-    combined_df = pd.concat(dfs, axis=1).ffill()
+    # Shared, cached price panel
+    combined_df = get_price_panel(DATA_DIR, snapshot_path=SNAPSHOT_FILE)
+    if combined_df is None:
+        return {"status": "error", "message": "No valid CSVs found"}
 
-    # Keep only user-selected stocks
-    available = [s for s in selected_stocks if s in combined_df.columns]
+    # Keep only user-selected stocks, in universe order so every pair is
+    # tested in the same direction as /automatic-mode (and hits its cache)
+    available = [s for s in combined_df.columns if s in selected_stocks]
     if len(available) < 2:
         return {"status": "error", "message": "Selected stocks not found in dataset."}
 
-    user_df = combined_df[available].ffill()
+    if anchor not in available:
+        return {"status": "error", "message": "Anchor stock not found in dataset."}
 
-    # Cointegration within subset
-    pairs, pval_matrix = find_cointegrated_pairs(user_df, significance=0.1)
+    user_df = combined_df[available].ffill()
 
-    # Filter pairs that include anchor
-    subset_pairs = [(a, b, p) for (a, b, p) in pairs if anchor in (a, b)]
+    # Cointegration of the anchor against each other selected stock only
+    anchor_results, _ = find_anchor_pairs(user_df, anchor, engine="batched", use_cache=True)
 
-    # Determine best pair
+    # Determine best pair: lowest p-value among significant anchor pairs
+    subset_pairs = [r for r in anchor_results if r[2] < 0.1]
     if subset_pairs:
-        a, b, pval = sorted(subset_pairs, key=lambda x: x[2])[0]
-        pair_stock = b if a == anchor else a
+        _, pair_stock, pval, _, _ = sorted(subset_pairs, key=lambda x: x[2])[0]
     else:
-        # fallback: top-scoring pair from your utility
-        try:
-            top = get_top_n_pairs(user_df, pval_matrix, n=1)
-            stock1, stock2, pval, corr, score = top[0]
-            pair_stock = stock2 if stock1 == anchor else stock1
-        except:
-            # final fallback: correlation
-            corr_series = user_df.corr()[anchor].drop(anchor)
-            pair_stock = corr_series.idxmax()
-            pval = 1.0
+        # fallback: correlation
+        _, pair_stock, _, _, _ = max(anchor_results, key=lambda x: -np.inf if pd.isnull(x[3]) else x[3])
+        pval = 1.0
 
     # ============= Build Pair DataFrame (CORRECT PLACE) =============
     stock_a = anchor
@@ -234,17 +308,7 @@ async def custom_mode(body: CustomRequest):
     x = df_pair[stock_b]
 
     # === Analytics ===
-    hedge_ratio = get_hedge_ratio(y, x)
-    spread = calculate_spread(y, x, hedge_ratio)
-
-    rolling_mean = spread.rolling(window=20, min_periods=1).mean()
-    rolling_std = spread.rolling(window=20, min_periods=1).std()
-    zscore = (spread - rolling_mean) / rolling_std
-
-    # Rolling correlation
-    y_norm = (y - y.mean()) / y.std()
-    x_norm = (x - x.mean()) / x.std()
-    rolling_corr = y_norm.rolling(window=20, min_periods=1).corr(x_norm)
+    hedge_ratio, spread, rolling_mean, zscore, rolling_corr = pair_analytics(y, x, body.hedge_method)
 
     signals = list(generate_signals(spread, zscore))
     idx = df_pair.index
@@ -264,17 +328,14 @@ async def custom_mode(body: CustomRequest):
     }
 
     # Backtest
-    from backend.pair_trading.scripts.cointegration_utils import backtest_pair
-    trade_results = backtest_pair(
+    records = pair_trade_records(
         y.values,
         x.values,
         signals,
         idx,
-        stock_a,
-        stock_b
     )
 
-    return {
+    response = {
         "status": "ok",
         "anchor": stock_a,
         "best_pair": [stock_a, stock_b],
@@ -289,5 +350,8 @@ async def custom_mode(body: CustomRequest):
         "zscore": clean_series(zscore),
         "correlation": clean_series(rolling_corr),
         "signals": [("HOLD" if s is None else str(s)) for s in signals],
-        "backtest_results": trade_results,
     }
+    if body.bootstrap:
+        response["backtest_bootstrap"] = backtest_bootstrap(
+            y.values, x.values, signals, body.bootstrap, body.bootstrap_method)
+    return pair_response(response, records, stock_a, stock_b, body.trade_format)
@@ -1,10 +1,14 @@
 import pandas as pd
 
+from scripts.rolling_kernel import rolling_pair_stats
+
 def calculate_rolling_strategy(df, stock1, stock2, window=10, threshold=2):
-    spread = df[stock1] - df[stock2]
-    rolling_mean = spread.rolling(window=window).mean()
-    rolling_std = spread.rolling(window=window).std()
-    zscore = (spread - rolling_mean) / rolling_std
+    stats = rolling_pair_stats(df[stock1].values, df[stock2].values, 1.0,
+                               window=window, min_periods=window)
+    spread = pd.Series(stats["spread"], index=df.index)
+    rolling_mean = pd.Series(stats["mean"], index=df.index)
+    rolling_std = pd.Series(stats["std"], index=df.index)
+    zscore = pd.Series(stats["zscore"], index=df.index)
 
     buy_signal = zscore < -threshold
     sell_signal = zscore > threshold
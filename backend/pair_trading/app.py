@@ -17,11 +17,12 @@ from scripts.cointegration_utils import (
     generate_signals
 )
 from scripts.pair_selection import get_top_n_pairs
+from scripts.snapshot import default_snapshot_path
 
 
 def run_automatic_mode():
-    # Step 1: Load data
-    raw_df = load_and_merge_data('data')
+    # Step 1: Load data (opens data/it_stocks.arrow when it is up to date)
+    raw_df = load_and_merge_data('data', snapshot_path=default_snapshot_path('data'))
     prepared_df = prepare_data(raw_df)
 
     # Step 2: Cointegration analysis
@@ -1,36 +1,64 @@
+# Run from the repo root: python -m backend.pair_trading.merge_all_stocks [--incremental]
 import os
-import pandas as pd
+import sys
+
+from .scripts.alignment import align_to_frame
+from .scripts.data_loader import load_quote_files
+from .scripts.price_store import stock_name_from_path, append_new_bars
+from .scripts.snapshot import write_snapshot, read_snapshot, SNAPSHOT_NAME
 
 DATA_DIR = "backend/pair_trading/data"
 OUTPUT_FILE = os.path.join(DATA_DIR, "it_stocks.csv")
+SNAPSHOT_FILE = os.path.join(DATA_DIR, SNAPSHOT_NAME)
+
+def append_new_stock_rows(snapshot_dtype="float64"):
+    """
+    End-of-day refresh: append only the bars newer than the snapshot's last
+    date to the snapshot and to it_stocks.csv. If tickers were added or
+    removed since the snapshot was compiled, both are rebuilt instead.
+    """
+    snapshot = read_snapshot(SNAPSHOT_FILE)
+    names = [stock_name_from_path(f) for f in os.listdir(DATA_DIR)
+             if f.endswith(".csv") and f.startswith("Quote-Equity")]
+    if sorted(names) != sorted(snapshot.columns):
+        print("[WARN] tickers changed since the snapshot was compiled; running a full merge.")
+        merge_all_stocks(snapshot_dtype=snapshot_dtype)
+        return
+
+    last_date = snapshot.index[-1]
+    panel = append_new_bars(DATA_DIR, snapshot_path=SNAPSHOT_FILE)
+    new_rows = panel[panel.index > last_date]
+
+    new_rows.to_csv(OUTPUT_FILE, mode="a", header=False)
+    print(f"✅ Appended {len(new_rows)} new rows to: {SNAPSHOT_FILE} and {OUTPUT_FILE}")
+
+def merge_all_stocks(snapshot_dtype="float64", incremental=False):
+    if incremental and os.path.exists(SNAPSHOT_FILE) and os.path.exists(OUTPUT_FILE):
+        append_new_stock_rows(snapshot_dtype)
+        return
 
-def merge_all_stocks():
-    combined_df = pd.DataFrame()
+    files = [os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR)
+             if f.endswith(".csv") and f.startswith("Quote-Equity")]
 
-    for file in os.listdir(DATA_DIR):
-        if file.endswith(".csv") and file.startswith("Quote-Equity"):
-            file_path = os.path.join(DATA_DIR, file)
-            df = pd.read_csv(file_path, index_col=0)
+    # Clean data and take only the close price
+    parsed, names = [], []
+    for file_path, result in zip(files, load_quote_files(files)):
+        if result is not None:
+            parsed.append(result)
+            names.append(stock_name_from_path(file_path))
 
-            # Clean data
-            df.index = pd.to_datetime(df.index, errors="coerce")
-            df = df[~df.index.isna()]
+    # Outer-join every ticker on date in one pass
+    combined_df = align_to_frame(parsed, names, how="outer", index_name="date")
 
-            # Take only "Close Price" (adjust if needed)
-            if "Close Price" in df.columns:
-                stock_name = file.replace("Quote-Equity-", "").replace(".csv", "")
-                combined_df[stock_name] = (
-                    df["Close Price"]
-                    .astype(str)
-                    .str.replace(",", "", regex=False)
-                    .astype(float)
-                )
+    # Compile the columnar snapshot before filling so readers can choose
+    # inner or forward-filled semantics
+    write_snapshot(combined_df, SNAPSHOT_FILE, dtype=snapshot_dtype)
+    print(f"✅ Snapshot compiled at: {SNAPSHOT_FILE}")
 
-    combined_df.sort_index(inplace=True)
-    combined_df.fillna(method="ffill", inplace=True)
+    combined_df = combined_df.ffill()
 
     combined_df.to_csv(OUTPUT_FILE)
     print(f"✅ Merged file created at: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    merge_all_stocks()
+    merge_all_stocks(incremental="--incremental" in sys.argv)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+
+def _ffill_columns(matrix):
+    """Forward fill NaNs down each column of matrix in place."""
+    rows = np.arange(matrix.shape[0])
+    for j in range(matrix.shape[1]):
+        col = matrix[:, j]
+        idx = np.where(np.isnan(col), 0, rows)
+        np.maximum.accumulate(idx, out=idx)
+        col[:] = col[idx]
+
+
+def align_series(parsed, how="inner"):
+    """
+    Align N (dates, values) series on date in a single pass.
+
+    Every series must have sorted, unique dates (as returned by
+    parse_quote_file). All date indexes are merged at once and each value is
+    scattered straight into its row, so the output matrix is allocated exactly
+    once instead of being copied on every pairwise merge.
+
+    how="inner" keeps dates present in every series, how="outer" keeps the
+    union of dates with NaN gaps and how="ffill" is outer with gaps forward
+    filled.
+
+    Returns (dates, matrix) with matrix shaped (len(dates), N).
+    """
+    if how not in ("inner", "outer", "ffill"):
+        raise ValueError(f"Unknown alignment: {how}")
+
+    k = len(parsed)
+    if k == 0:
+        return np.array([], dtype="datetime64[ns]"), np.empty((0, 0))
+
+    lengths = np.array([len(d) for d, _ in parsed])
+    all_dates = np.concatenate([np.asarray(d, dtype="datetime64[ns]") for d, _ in parsed])
+    all_values = np.concatenate([np.asarray(v, dtype=np.float64) for _, v in parsed])
+    cols = np.repeat(np.arange(k), lengths)
+
+    dates, rows, counts = np.unique(all_dates, return_inverse=True, return_counts=True)
+
+    if how == "inner":
+        keep = counts == k
+        row_map = np.cumsum(keep) - 1
+        dates = dates[keep]
+        present = keep[rows]
+        rows, cols, all_values = row_map[rows[present]], cols[present], all_values[present]
+
+    matrix = np.full((len(dates), k), np.nan)
+    matrix[rows, cols] = all_values
+
+    if how == "ffill":
+        _ffill_columns(matrix)
+    return dates, matrix
+
+
+def align_to_frame(parsed, names, how="inner", index_name="Date"):
+    """align_series wrapped as a dates x names DataFrame."""
+    dates, matrix = align_series(parsed, how=how)
+    return pd.DataFrame(matrix, index=pd.DatetimeIndex(dates, name=index_name), columns=list(names))
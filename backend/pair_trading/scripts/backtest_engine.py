@@ -0,0 +1,186 @@
+import numpy as np
+
+from .signal_engine import SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_EXIT
+
+
+def _as_columns(a, dtype=np.float64):
+    a = np.asarray(a, dtype=dtype)
+    return (a[:, None], True) if a.ndim == 1 else (a, False)
+
+
+def _last_index(condition):
+    """[t, p] = last s <= t with condition[s, p], or -1."""
+    last = np.where(condition, np.arange(condition.shape[0])[:, None], -1)
+    return np.maximum.accumulate(last, axis=0)
+
+
+def _fill_forward(a):
+    """Carry the last finite value of each column over NaN gaps."""
+    last = _last_index(np.isfinite(a))
+    return np.where(last >= 0, a[np.maximum(last, 0), np.arange(a.shape[1])], np.nan)
+
+
+def trade_positions(signals):
+    """
+    Position state machine of backtest_pair for a (T,) or (T, pairs) array
+    of signal codes: from flat, a LONG/SHORT signal opens a trade on its
+    bar; further entry signals are ignored until an EXIT closes it.
+
+    Every EXIT starts a new segment and only the first entry of a segment
+    opens a trade, so positions follow from cumulative counts and forward
+    fills instead of a loop over bars.
+
+    Returns (positions, entries, exits): positions (int8, 1 long spread,
+    -1 short, 0 flat) held after each bar, and boolean arrays marking the
+    bars that open and close trades.
+    """
+    signals, squeeze = _as_columns(signals, dtype=np.int8)
+    T, P = signals.shape
+    if T == 0:
+        empty = np.zeros((0, P), dtype=bool)
+        positions = np.zeros((0, P), dtype=np.int8)
+        return (positions[:, 0], empty[:, 0], empty[:, 0]) if squeeze else (positions, empty, empty)
+    cols = np.arange(P)
+    is_entry = (signals == SIGNAL_LONG) | (signals == SIGNAL_SHORT)
+    is_exit = signals == SIGNAL_EXIT
+
+    # entry signals counted before the segment each bar belongs to
+    counted = np.cumsum(is_entry, axis=0)
+    last_exit = _last_index(is_exit)
+    prev_exit = np.vstack([np.full((1, P), -1), last_exit[:-1]])
+    base = np.where(prev_exit >= 0, counted[np.maximum(prev_exit, 0), cols], 0)
+    entries = is_entry & (counted - base == 1)
+
+    opened = _last_index(entries)
+    side = np.where(signals == SIGNAL_LONG, 1, -1).astype(np.int8)
+    live = opened > last_exit
+    positions = np.where(live, side[np.maximum(opened, 0), cols], 0).astype(np.int8)
+
+    held = np.vstack([np.zeros((1, P), dtype=np.int8), positions[:-1]])
+    exits = is_exit & (held != 0)
+    if squeeze:
+        return positions[:, 0], entries[:, 0], exits[:, 0]
+    return positions, entries, exits
+
+
+def mark_to_market(positions, y_prices, x_prices, hedge_ratio=1.0):
+    """
+    Daily PnL of holding `positions` (from trade_positions) in the spread
+    y - hedge_ratio * x: the position after bar t-1 earns the spread's
+    change into bar t. Missing prices are carried forward, so a gap earns
+    nothing and the move is booked when prices resume.
+
+    Returns a float array shaped like positions.
+    """
+    positions, squeeze = _as_columns(positions, dtype=np.int8)
+    y, _ = _as_columns(y_prices)
+    x, _ = _as_columns(x_prices)
+    spread = _fill_forward(y) - np.asarray(hedge_ratio, dtype=np.float64) * _fill_forward(x)
+    moves = np.zeros(positions.shape)
+    moves[1:] = np.nan_to_num(np.diff(spread, axis=0))
+    pnl = np.zeros(positions.shape)
+    pnl[1:] = positions[:-1] * moves[1:]
+    return pnl[:, 0] if squeeze else pnl
+
+
+def closed_trades(entries, exits, include_open=False):
+    """
+    (pair, entry bar, exit bar) index arrays of the completed trades, pair
+    by pair in time order. A trade still open on the last bar is left out,
+    or with include_open=True kept with an exit bar of T (one past the end).
+    """
+    entries, _ = _as_columns(entries, dtype=bool)
+    exits, _ = _as_columns(exits, dtype=bool)
+    # an entry is completed iff an exit follows it in its column
+    later_exit = np.cumsum(exits[::-1], axis=0)[::-1] > 0
+    pair_e, bar_e = np.nonzero((entries & later_exit).T)
+    _, bar_x = np.nonzero(exits.T)
+    if include_open:
+        # at most one open trade per pair, after its last exit
+        pair_o, bar_o = np.nonzero((entries & ~later_exit).T)
+        pair_e, bar_e = np.concatenate([pair_e, pair_o]), np.concatenate([bar_e, bar_o])
+        bar_x = np.concatenate([bar_x, np.full(len(pair_o), entries.shape[0])])
+        order = np.lexsort((bar_e, pair_e))
+        pair_e, bar_e, bar_x = pair_e[order], bar_e[order], bar_x[order]
+    return pair_e, bar_e, bar_x
+
+
+def equity_metrics(pnl, capital, periods_per_year=252):
+    """
+    Equity curve (capital + cumulative pnl), max drawdown (largest fall from
+    the running peak, as a fraction of the peak) and annualised Sharpe of
+    the returns on the previous bar's equity, for (T,) or (T, P) pnl.
+    """
+    pnl, squeeze = _as_columns(pnl)
+    T, P = pnl.shape
+    equity = capital + np.cumsum(pnl, axis=0)
+    peak = np.maximum.accumulate(equity, axis=0)
+    previous = np.vstack([np.full((1, P), float(capital)), equity[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = pnl / previous
+        std = returns.std(axis=0, ddof=1) if T > 1 else np.full(P, np.nan)
+        sharpe = np.where(std > 0, returns.mean(axis=0) / std * np.sqrt(periods_per_year), np.nan)
+        max_drawdown = np.max((peak - equity) / peak, axis=0, initial=0.0)
+    if squeeze:
+        return equity[:, 0], max_drawdown[0].item(), sharpe[0].item()
+    return equity, max_drawdown, sharpe
+
+
+def backtest_signals(signals, y_prices, x_prices, hedge_ratio=1.0, capital=100000.0,
+                     periods_per_year=252):
+    """
+    Array backtest of signal codes on one or many pairs: y_prices,
+    x_prices and signals are (T,) or (T, pairs) arrays, trading one unit of
+    y against hedge_ratio units of x (scalar, per pair or per bar).
+
+    Returns a dict:
+      positions, pnl, equity   per bar (equity starts at capital)
+      max_drawdown             largest fall of equity from its running
+                               peak, as a fraction of the peak
+      sharpe                   annualised mean / std of daily returns on
+                               the previous bar's equity
+      n_trades                 closed trades
+      hit_rate                 share of closed trades with a positive PnL
+      turnover                 notional traded (|y| + |hedge_ratio * x| per
+                               unit of position change) over capital
+      trades                   (pair, entry bar, exit bar) of closed trades
+      trade_pnl                mark-to-market PnL of each closed trade
+    Summary statistics are scalars for 1-D input, else one per pair.
+    """
+    signals, squeeze = _as_columns(signals, dtype=np.int8)
+    positions, entries, exits = trade_positions(signals)
+    y, _ = _as_columns(y_prices)
+    x, _ = _as_columns(x_prices)
+    hedge = np.asarray(hedge_ratio, dtype=np.float64)
+    pnl = mark_to_market(positions, y, x, hedge)
+    P = positions.shape[1]
+
+    equity, max_drawdown, sharpe = equity_metrics(pnl, capital, periods_per_year)
+
+    pair, bar_e, bar_x = closed_trades(entries, exits)
+    trade_pnl = equity[bar_x, pair] - equity[bar_e, pair]
+    n_trades = np.bincount(pair, minlength=P)
+    wins = np.bincount(pair, weights=trade_pnl > 0, minlength=P)
+
+    changes = np.abs(np.diff(positions, axis=0, prepend=0))
+    notional = np.abs(_fill_forward(y)) + np.abs(np.broadcast_to(hedge, x.shape) * _fill_forward(x))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hit_rate = np.where(n_trades > 0, wins / n_trades, np.nan)
+    turnover = np.nansum(changes * notional, axis=0) / capital
+
+    summary = {
+        "max_drawdown": max_drawdown,
+        "sharpe": sharpe,
+        "n_trades": n_trades,
+        "hit_rate": hit_rate,
+        "turnover": turnover,
+    }
+    result = {"positions": positions, "pnl": pnl, "equity": equity}
+    if squeeze:
+        result = {k: v[:, 0] for k, v in result.items()}
+        summary = {k: v[0].item() for k, v in summary.items()}
+    result.update(summary)
+    result["trades"] = (pair, bar_e, bar_x)
+    result["trade_pnl"] = trade_pnl
+    return result
@@ -0,0 +1,190 @@
+import os
+import time
+import heapq
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from statsmodels.tsa.vector_ar.vecm import coint_johansen
+
+from .pair_selection import prescreen_pairs
+from .parallel_scan import _attach, shared_values
+
+DEFAULT_BUDGET = 500
+# stop enumerating clusters after this many candidates per budget slot
+ENUMERATION_FACTOR = 20
+# Johansen critical value column: 0 = 90%, 1 = 95%, 2 = 99%
+_CRIT_COLUMNS = {0.10: 0, 0.05: 1, 0.01: 2}
+
+
+def basket_candidates(data, sizes=(3, 4, 5), top_k=8, budget=DEFAULT_BUDGET, method="correlation"):
+    """
+    Candidate baskets of len in sizes, restricted to tightly connected
+    clusters: every two members of a basket must be among each other's
+    top_k most similar tickers (prescreen_pairs), i.e. each basket is a
+    clique of the pre-screen graph.
+
+    Cliques are grown through common neighbours, starting from the tickers
+    most correlated with their neighbours so the strongest clusters are
+    seen first; enumeration stops after ENUMERATION_FACTOR * budget cliques
+    and the budget baskets with the highest mean pairwise correlation are
+    kept.
+
+    Returns (baskets, report): baskets is a list of (mean_corr, column
+    positions) tuples, best first.
+    """
+    started = time.perf_counter()
+    stocks = list(data.columns)
+    position = {s: i for i, s in enumerate(stocks)}
+    edges, _ = prescreen_pairs(data, top_k=top_k, method=method)
+
+    neighbours = [set() for _ in stocks]
+    for a, b in edges:
+        i, j = position[a], position[b]
+        neighbours[i].add(j)
+        neighbours[j].add(i)
+
+    corr = np.nan_to_num(data.corr().to_numpy())
+    strength = np.array([corr[i, list(nb)].mean() if nb else -np.inf for i, nb in enumerate(neighbours)])
+    order = np.argsort(-strength, kind="stable")
+    rank = np.empty(len(stocks), dtype=int)
+    rank[order] = np.arange(len(stocks))
+    sizes = sorted(sizes)
+    limit = ENUMERATION_FACTOR * budget
+    best = []      # min-heap of (mean_corr, members)
+    enumerated = 0
+
+    def extend(members, common):
+        nonlocal enumerated
+        if enumerated >= limit:
+            return
+        if len(members) in sizes:
+            enumerated += 1
+            idx = np.array(members)
+            mean_corr = corr[np.ix_(idx, idx)][np.triu_indices(len(idx), k=1)].mean()
+            entry = (float(mean_corr), tuple(members))
+            if len(best) < budget:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+        if len(members) < sizes[-1]:
+            last = rank[members[-1]]
+            for j in sorted((c for c in common if rank[c] > last), key=lambda c: rank[c]):
+                extend(members + [j], common & neighbours[j])
+
+    for i in order:
+        extend([int(i)], neighbours[i])
+
+    baskets = sorted(best, reverse=True)
+    report = {
+        "top_k": top_k,
+        "budget": budget,
+        "enumerated": enumerated,
+        "truncated": enumerated >= limit,
+        "candidates": len(baskets),
+        "candidate_seconds": time.perf_counter() - started,
+    }
+    print(f"[DEBUG] Basket candidates: kept {len(baskets)} of {enumerated} clusters "
+          f"in {report['candidate_seconds']:.3f}s")
+    return baskets, report
+
+
+def johansen_basket(values, det_order=0, k_ar_diff=1, significance=0.05):
+    """
+    Johansen trace test on the columns of a (T, k) price matrix (rows with
+    a missing price dropped).
+
+    Returns (rank, trace_stat, critical_value, weights): the cointegration
+    rank at the given significance, the r = 0 trace statistic and its
+    critical value, and the first eigenvector normalised so the first
+    ticker's weight is 1 (the basket spread is values @ weights).
+    """
+    values = values[np.isfinite(values).all(axis=1)]
+    result = coint_johansen(values, det_order, k_ar_diff)
+    crit = result.cvt[:, _CRIT_COLUMNS[significance]]
+    above = result.lr1 > crit
+    rank = len(above) if above.all() else int(np.argmin(above))
+    weights = result.evec[:, 0] / result.evec[0, 0]
+    return rank, result.lr1[0], crit[0], weights
+
+
+def _test_baskets(baskets, det_order, k_ar_diff, significance, values=None):
+    values = shared_values() if values is None else values
+    results, errors = [], []
+    for members in baskets:
+        try:
+            results.append((members,) + johansen_basket(values[:, list(members)], det_order,
+                                                        k_ar_diff, significance))
+        except Exception as e:
+            errors.append((members, str(e)))
+    return results, errors
+
+
+def find_cointegrated_baskets(data, sizes=(3, 4, 5), top_k=8, budget=DEFAULT_BUDGET,
+                              significance=0.05, det_order=0, k_ar_diff=1,
+                              workers=None, chunk_size=50):
+    """
+    Basket discovery: Johansen tests on the candidate baskets from
+    basket_candidates, returning hedge weights for the cointegrated ones.
+
+    At most `budget` baskets are tested, so the run time is bounded however
+    large the universe. With workers > 1 the baskets are tested on a process
+    pool in chunks of chunk_size, attached to the price matrix through shared
+    memory as in parallel_scan.
+
+    Returns (baskets, report): baskets is a list of dicts (stocks, weights,
+    rank, trace_stat, critical_value, mean_corr) with rank >= 1, strongest
+    first (trace statistic over critical value).
+    """
+    if significance not in _CRIT_COLUMNS:
+        raise ValueError("significance must be one of 0.10, 0.05 or 0.01")
+
+    candidates, report = basket_candidates(data, sizes=sizes, top_k=top_k, budget=budget)
+    started = time.perf_counter()
+    values = np.ascontiguousarray(data.to_numpy(dtype=float))
+    members = [m for _, m in candidates]
+    mean_corr = {m: c for c, m in candidates}
+    workers = workers or 1
+
+    results, errors = [], []
+    if workers <= 1 or len(members) <= chunk_size:
+        results, errors = _test_baskets(members, det_order, k_ar_diff, significance, values=values)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+            with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1), initializer=_attach,
+                                     initargs=(shm.name, values.shape, None)) as pool:
+                futures = [pool.submit(_test_baskets, members[start:start + chunk_size],
+                                       det_order, k_ar_diff, significance)
+                           for start in range(0, len(members), chunk_size)]
+                for future in futures:
+                    chunk_results, chunk_errors = future.result()
+                    results.extend(chunk_results)
+                    errors.extend(chunk_errors)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    stocks = data.columns
+    for m, message in errors:
+        print(f"[ERROR] johansen({','.join(stocks[i] for i in m)}): {message}")
+
+    baskets = [{
+        "stocks": [stocks[i] for i in m],
+        "weights": [float(w) for w in weights],
+        "rank": rank,
+        "trace_stat": float(trace),
+        "critical_value": float(crit),
+        "mean_corr": mean_corr[m],
+    } for m, rank, trace, crit, weights in results if rank >= 1]
+    baskets.sort(key=lambda b: b["trace_stat"] / b["critical_value"], reverse=True)
+
+    report.update({
+        "tested": len(results),
+        "failed": len(errors),
+        "cointegrated": len(baskets),
+        "test_seconds": time.perf_counter() - started,
+    })
+    print(f"[DEBUG] Johansen: {len(baskets)} of {len(results)} baskets cointegrated "
+          f"in {report['test_seconds']:.3f}s")
+    return baskets, report
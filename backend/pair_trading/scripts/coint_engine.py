@@ -0,0 +1,196 @@
+import numpy as np
+from scipy.stats import norm
+from statsmodels.tsa.adfvalues import (
+    _tau_maxs, _tau_mins, _tau_stars, _tau_smallps, _tau_largeps,
+)
+
+# statsmodels' cut-off for "perfectly collinear" first-stage regressions
+SQRTEPS = np.sqrt(np.finfo(np.float64).eps)
+# upper bound on the (pairs x obs x lags) design block built at once
+MAX_BLOCK_ELEMENTS = 8_000_000
+
+
+def mackinnon_pvalues(stats, regression="c", N=2):
+    """
+    Vectorized MacKinnon (1994) approximate p-values, using the same
+    precomputed tables as statsmodels.tsa.adfvalues.mackinnonp.
+    """
+    stats = np.asarray(stats, dtype=np.float64)
+    small = np.polyval(_tau_smallps[regression][N - 1][::-1], stats)
+    large = np.polyval(_tau_largeps[regression][N - 1][::-1], stats)
+    pvals = norm.cdf(np.where(stats <= _tau_stars[regression][N - 1], small, large))
+    pvals = np.where(stats > _tau_maxs[regression][N - 1], 1.0, pvals)
+    pvals = np.where(stats < _tau_mins[regression][N - 1], 0.0, pvals)
+    return pvals
+
+
+def default_maxlag(nobs):
+    """Schwert's rule, capped like statsmodels.adfuller with regression="n"."""
+    maxlag = int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0)))
+    return min(nobs // 2 - 1, maxlag)
+
+
+def _adf_design(resid, k, nobs):
+    """
+    ADF regression for a batch of series: y = diff(e)[t] on e[t-1] and
+    k - 1 lagged differences, over the last nobs observations.
+    Returns X (pairs, nobs, k) and y (pairs, nobs).
+    """
+    d = np.diff(resid, axis=1)
+    X = np.empty((resid.shape[0], nobs, k))
+    X[:, :, 0] = resid[:, -nobs - 1:-1]
+    for j in range(1, k):
+        X[:, :, j] = d[:, -nobs - j:-j]
+    return X, d[:, -nobs:]
+
+
+def _gram(X, y):
+    return np.einsum("pnk,pnl->pkl", X, X), np.einsum("pnk,pn->pk", X, y), np.einsum("pn,pn->p", y, y)
+
+
+def select_lags_aic(XtX, Xty, yty, nobs):
+    """
+    AIC-best lag for each series from the cross products of its full ADF
+    regression (column 0 = e[t-1], column L = L-th lagged difference) over
+    a common sample of nobs observations. Returns the lag (0..K-1) per row.
+    """
+    P, K = Xty.shape
+    aic = np.empty((P, K))
+    for L in range(1, K + 1):
+        beta = np.linalg.solve(XtX[:, :L, :L], Xty[:, :L, None])[:, :, 0]
+        ssr = np.maximum(yty - np.einsum("pk,pk->p", beta, Xty[:, :L]), 1e-300)
+        aic[:, L - 1] = nobs * (np.log(2 * np.pi) + np.log(ssr / nobs) + 1) + 2 * L
+    return np.argmin(aic, axis=1)
+
+
+def adf_tstats_from_gram(XtX, Xty, yty, nobs):
+    """t-statistic of the e[t-1] coefficient from ADF cross products."""
+    k = Xty.shape[1]
+    inv = np.linalg.inv(XtX)
+    beta = np.einsum("pkl,pl->pk", inv, Xty)
+    ssr = np.maximum(yty - np.einsum("pk,pk->p", beta, Xty), 0.0)
+    s2 = ssr / (nobs - k)
+    return beta[:, 0] / np.sqrt(s2 * inv[:, 0, 0])
+
+
+def _adf_tstats(resid, maxlag):
+    """
+    ADF t-statistics (no constant, AIC lag selection) for every row of resid,
+    matching statsmodels.adfuller(resid, regression="n", autolag="aic").
+
+    All lag lengths are scored from one cross-product matrix per series with
+    batched solves, then the chosen lag is refit on its full sample.
+    """
+    P, T = resid.shape
+    K = maxlag + 1
+    nobs = T - 1 - maxlag
+
+    # lag selection on the common sample
+    X, y = _adf_design(resid, K, nobs)
+    usedlag = select_lags_aic(*_gram(X, y), nobs)
+
+    # refit each pair with its chosen lag
+    tstats = np.empty(P)
+    for lag in np.unique(usedlag):
+        rows = np.flatnonzero(usedlag == lag)
+        k, n = lag + 1, T - 1 - lag
+        X, y = _adf_design(resid[rows], k, n)
+        tstats[rows] = adf_tstats_from_gram(*_gram(X, y), n)
+    return tstats
+
+
+def batched_coint(Y, X, maxlag=None):
+    """
+    Engle-Granger cointegration test of Y[:, p] on X[:, p] for every column p,
+    equivalent to statsmodels.tsa.stattools.coint(Y[:, p], X[:, p]) with the
+    default constant trend and AIC lag selection.
+
+    The first-stage OLS (with constant) for all pairs is solved in closed
+    form from means, variances and covariances, and the ADF regressions on
+    the residuals use batched least squares, in blocks of pairs to bound
+    memory. Inputs must be NaN-free, shape (T, pairs).
+
+    Returns (tstats, pvalues) arrays of length pairs.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    X = np.asarray(X, dtype=np.float64)
+    T, P = Y.shape
+    if maxlag is None:
+        maxlag = default_maxlag(T)
+    if maxlag < 0:
+        raise ValueError("sample size is too short to use selected regression component")
+
+    tstats = np.empty(P)
+    block = max(1, MAX_BLOCK_ELEMENTS // (T * (maxlag + 1)))
+    for start in range(0, P, block):
+        y, x = Y[:, start:start + block], X[:, start:start + block]
+
+        y_mean, x_mean = y.mean(axis=0), x.mean(axis=0)
+        yc, xc = y - y_mean, x - x_mean
+        sxx = np.einsum("tp,tp->p", xc, xc)
+        sxy = np.einsum("tp,tp->p", xc, yc)
+        syy = np.einsum("tp,tp->p", yc, yc)
+        beta = sxy / sxx
+        resid = (yc - beta * xc).T
+        rsquared = 1 - np.einsum("pt,pt->p", resid, resid) / syy
+
+        stats = np.full(resid.shape[0], -np.inf)
+        ok = rsquared < 1 - 100 * SQRTEPS
+        if ok.any():
+            stats[ok] = _adf_tstats(resid[ok], maxlag)
+        tstats[start:start + block] = stats
+
+    return tstats, mackinnon_pvalues(tstats, regression="c", N=2)
+
+
+def coint_pvalue_matrix(values):
+    """
+    Upper-triangle Engle-Granger p-values for all column pairs (i < j) of a
+    NaN-free (T, n) price matrix, column i regressed on column j like
+    coint(data[i], data[j]).
+
+    Returns an (n, n) array with p-values above the diagonal and 1.0 elsewhere.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[1]
+    rows, cols = np.triu_indices(n, k=1)
+    pvals = np.ones((n, n))
+
+    # gather the pair columns a block at a time rather than all at once
+    block = max(1, MAX_BLOCK_ELEMENTS // max(1, values.shape[0]))
+    for start in range(0, len(rows), block):
+        i, j = rows[start:start + block], cols[start:start + block]
+        _, pvals[i, j] = batched_coint(values[:, i], values[:, j])
+    return pvals
+
+
+def pair_ols_stats(values, rows, cols):
+    """
+    Hedge ratio (OLS slope of column rows[k] on cols[k], with constant) and
+    Pearson correlation for many pairs, over the rows where both prices are
+    present, computed in blocks of pairs from masked sums.
+
+    Returns (hedge_ratios, correlations).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    hedge = np.full(len(rows), np.nan)
+    corr = np.full(len(rows), np.nan)
+
+    block = max(1, MAX_BLOCK_ELEMENTS // max(1, values.shape[0]))
+    for start in range(0, len(rows), block):
+        y = values[:, rows[start:start + block]]
+        x = values[:, cols[start:start + block]]
+        mask = np.isfinite(y) & np.isfinite(x)
+        y, x = np.where(mask, y, 0.0), np.where(mask, x, 0.0)
+        count = mask.sum(axis=0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            y_mean, x_mean = y.sum(axis=0) / count, x.sum(axis=0) / count
+            yc, xc = np.where(mask, y - y_mean, 0.0), np.where(mask, x - x_mean, 0.0)
+            sxx = np.einsum("tp,tp->p", xc, xc)
+            sxy = np.einsum("tp,tp->p", xc, yc)
+            syy = np.einsum("tp,tp->p", yc, yc)
+            hedge[start:start + block] = sxy / sxx
+            corr[start:start + block] = sxy / np.sqrt(sxx * syy)
+    return hedge, corr
@@ -0,0 +1,133 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+from .coint_engine import MAX_BLOCK_ELEMENTS, default_maxlag, mackinnon_pvalues
+from .incremental_coint import z_rows, gram_coint_stats
+from .cointegration_utils import candidate_index
+
+
+def rolling_coint_scan(data, window=120, step=5, pairs=None):
+    """
+    Walk-forward Engle-Granger scan: p-value and hedge ratio of every pair
+    over sliding windows of `window` rows, moved forward `step` rows at a
+    time (same test as coint(data[stock1][w], data[stock2][w]) per window w).
+
+    The per-window sufficient statistics (see incremental_coint) are slid
+    along the data, adding the rows that enter and removing the rows that
+    leave, and recomputed exactly once the window has fully turned over, so
+    overlapping windows share their work instead of re-running coint().
+    Each window then only gathers the small per-pair sub-blocks it tests
+    (gram_coint_stats); the universe sums are updated in place.
+
+    pairs restricts the scan to those (stock1, stock2) tuples (tested in
+    column order, like find_cointegrated_pairs); by default every pair.
+
+    Returns a dict with "pairs" (list of (stock1, stock2)), "start_dates" and
+    "end_dates" (one per window) and "pvalues" / "hedge_ratios", float32
+    arrays of shape (pairs, windows). Windows in which a stock has missing or
+    constant prices are NaN.
+    """
+    values = data.to_numpy(dtype=float)
+    T, n = values.shape
+    maxlag = default_maxlag(window)
+    if window > T or maxlag < 0:
+        raise ValueError(f"window of {window} rows is too short or longer than the data ({T} rows)")
+
+    if pairs is None:
+        rows, cols = np.triu_indices(n, k=1)
+    else:
+        rows, cols = candidate_index(data.columns, pairs)
+
+    finite = np.isfinite(values)
+    offset = np.nan_to_num(np.nanmean(np.where(finite, values, np.nan), axis=0))
+    filled = np.where(finite, values, offset)
+    everything = np.ones(n, dtype=bool)
+
+    # f[t] = [1, p[t]] and Z[t - 1] = z[t], built once for the whole sample
+    f = np.hstack([np.ones((T, 1)), filled - offset])
+    Z = z_rows(filled, everything, offset, maxlag, 1, T)
+
+    starts = np.arange(0, T - window + 1, step)
+    pvals = np.full((len(rows), len(starts)), np.nan, dtype=np.float32)
+    hedge = np.full((len(rows), len(starts)), np.nan, dtype=np.float32)
+    d = 2 * maxlag + 5
+    block = max(1, MAX_BLOCK_ELEMENTS // (d * d))
+
+    F = G = None
+    for w, s in enumerate(starts):
+        e = s + window
+        if F is None or s - exact_start >= window:
+            # exact sums for window [s, e): f rows s..e-1, z rows s+maxlag+1..e-1
+            F = f[s:e].T @ f[s:e]
+            G = Z[s + maxlag:e - 1].T @ Z[s + maxlag:e - 1]
+            exact_start = s
+        else:
+            # slide from the previous window [prev, prev + window)
+            prev = starts[w - 1]
+            # in place, one product for the rows entering and leaving
+            old_f, new_f = f[prev:s], f[prev + window:e]
+            old_z, new_z = Z[prev + maxlag:s + maxlag], Z[prev + window - 1:e - 1]
+            F += np.vstack([new_f, old_f]).T @ np.vstack([new_f, -old_f])
+            G += np.vstack([new_z, old_z]).T @ np.vstack([new_z, -old_z])
+
+        ok = finite[s:e].all(axis=0) & (np.ptp(filled[s:e], axis=0) > 0)
+        testable = np.flatnonzero(ok[rows] & ok[cols])
+        heads = Z[s:s + maxlag]
+        for b in range(0, len(testable), block):
+            k = testable[b:b + block]
+            tstats, hedge[k, w] = gram_coint_stats(F, G, heads, window, maxlag, rows[k], cols[k])
+            pvals[k, w] = mackinnon_pvalues(tstats, regression="c", N=2)
+
+    return {
+        "pairs": [(data.columns[i], data.columns[j]) for i, j in zip(rows, cols)],
+        "start_dates": data.index[starts],
+        "end_dates": data.index[starts + window - 1],
+        "pvalues": pvals,
+        "hedge_ratios": hedge,
+    }
+
+
+def rank_pair_stability(scan, significance=0.05):
+    """
+    Rank the pairs of a rolling_coint_scan by how consistently they stay
+    cointegrated: share of tested windows with p < significance, then
+    median p-value. hedge_cv (std / |mean| of the window hedge ratios)
+    shows how much the hedge ratio moves between windows.
+    """
+    pvals = scan["pvalues"].astype(np.float64)
+    hedge = scan["hedge_ratios"].astype(np.float64)
+    tested = np.isfinite(pvals).sum(axis=1)
+
+    # pairs never tested (or a scan without windows) come out as NaN
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        coint_fraction = (pvals < significance).sum(axis=1) / tested
+        median_pvalue = np.nanmedian(pvals, axis=1)
+        hedge_mean = np.nanmean(hedge, axis=1)
+        hedge_cv = np.nanstd(hedge, axis=1) / np.abs(hedge_mean)
+
+    ranking = pd.DataFrame({
+        "stock1": [p[0] for p in scan["pairs"]],
+        "stock2": [p[1] for p in scan["pairs"]],
+        "coint_fraction": coint_fraction,
+        "median_pvalue": median_pvalue,
+        "hedge_mean": hedge_mean,
+        "hedge_cv": hedge_cv,
+        "windows_tested": tested,
+    })
+    return ranking.sort_values(["coint_fraction", "median_pvalue"],
+                               ascending=[False, True]).reset_index(drop=True)
+
+
+def pair_stability_history(scan, stock1, stock2):
+    """P-value and hedge ratio of one pair per window, indexed by window end date."""
+    pairs = scan["pairs"]
+    if (stock1, stock2) in pairs:
+        k = pairs.index((stock1, stock2))
+    elif (stock2, stock1) in pairs:
+        k = pairs.index((stock2, stock1))
+    else:
+        raise KeyError(f"{stock1}/{stock2} is not part of this scan")
+    return pd.DataFrame({"pvalue": scan["pvalues"][k], "hedge_ratio": scan["hedge_ratios"][k]},
+                        index=scan["end_dates"])
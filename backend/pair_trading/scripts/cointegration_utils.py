@@ -1,14 +1,50 @@
+import time
+import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 from statsmodels.tsa.stattools import coint
 
-def find_cointegrated_pairs(data, significance=0.05):
+from .coint_engine import pair_ols_stats
+from .hedge_engine import pair_hedge_ratios
+from .parallel_scan import scan_pairs, parallel_pvalue_matrix
+from .incremental_coint import incremental_pvalue_matrix
+from .kalman_hedge import KalmanHedge, DEFAULT_DELTA, DEFAULT_OBS_VAR
+from .signal_engine import band_signals, signal_labels
+from .trade_records import pair_trade_records, records_to_rows
+from .rolling_kernel import rolling_mean_std
+from .pvalue_cache import pair_keys, lookup_pair_results, store_pair_results
+
+def candidate_index(columns, candidates):
+    """Column positions (i < j) for a list of (stock1, stock2) candidates."""
+    a = columns.get_indexer([c[0] for c in candidates])
+    b = columns.get_indexer([c[1] for c in candidates])
+    known = (a >= 0) & (b >= 0) & (a != b)
+    rows, cols = np.minimum(a, b)[known], np.maximum(a, b)[known]
+    order = np.lexsort((cols, rows))
+    return rows[order], cols[order]
+
+def find_cointegrated_pairs(data, significance=0.05, engine="statsmodels",
+                            workers=None, chunk_size=None, candidates=None,
+                            use_cache=False, report_pruned=True):
     """
     Finds all pairs of columns in `data` that are cointegrated.
     Cleans numeric columns first (remove commas, convert to float).
+
+    engine="statsmodels" runs coint() pair by pair (reference implementation).
+    engine="batched" tests all pairs at once with coint_engine; columns with
+    missing or constant values still go through coint().
+    engine="incremental" keeps per-pair sufficient statistics between calls
+    (see incremental_coint), so calling it again with a day appended to data
+    only folds in the new bar; workers is ignored, and with use_cache the
+    results missing from the cache are stored for other callers.
+    workers > 1 scans the pairs on a process pool in chunks of chunk_size,
+    with either engine.
+    candidates (e.g. from pair_selection.prescreen_pairs) restricts testing to
+    those (stock1, stock2) pairs; all other pairs keep a p-value of 1.0.
+    report_pruned=False skips the pre-screen summary, for candidates that do
+    not come from a pre-screen (e.g. find_anchor_pairs).
+    use_cache=True reuses per-pair results from pvalue_cache and stores the
+    newly tested ones (p-value, statistic, hedge ratio, correlation).
     """
-    import numpy as np
-    
     # Clean numeric columns: remove commas and convert to float
     data = data.apply(lambda col: 
                       pd.to_numeric(col.astype(str).str.replace(",", ""), errors="coerce")
@@ -17,6 +53,76 @@ def find_cointegrated_pairs(data, significance=0.05):
     n = data.shape[1]
     pval_matrix = pd.DataFrame(1.0, index=data.columns, columns=data.columns)
     pairs = []
+    parallel = workers is not None and workers > 1
+
+    if engine in ("batched", "incremental") or parallel or candidates is not None or use_cache:
+        if candidates is None:
+            rows, cols = np.triu_indices(n, k=1)
+        else:
+            rows, cols = candidate_index(data.columns, candidates)
+
+        started = time.perf_counter()
+        values = data.to_numpy(dtype=float)
+        pvals = np.ones((n, n))
+
+        # Serve what we can from the cache, test the rest (the incremental
+        # engine scans everything anyway and only stores what is missing)
+        todo = np.ones(len(rows), dtype=bool)
+        if use_cache:
+            keys = pair_keys(data, rows, cols)
+            hits = lookup_pair_results(keys)
+            for k, key in enumerate(keys):
+                if key in hits:
+                    pvals[rows[k], cols[k]] = hits[key][0]
+                    todo[k] = False
+        test_rows, test_cols = rows[todo], cols[todo]
+
+        if engine == "incremental":
+            scanned, scanned_tstats, errors = incremental_pvalue_matrix(data)
+            pvals[rows, cols] = scanned[rows, cols]
+            tstats = scanned_tstats[test_rows, test_cols]
+        elif not len(test_rows):
+            errors = []
+        elif parallel:
+            scanned, tstats, errors = parallel_pvalue_matrix(
+                values, engine=engine, workers=workers, chunk_size=chunk_size,
+                rows=test_rows, cols=test_cols,
+            )
+            pvals[test_rows, test_cols] = scanned[test_rows, test_cols]
+            tstats = tstats[test_rows, test_cols]
+        else:
+            pvals[test_rows, test_cols], tstats, errors = scan_pairs(values, test_rows, test_cols, engine=engine)
+
+        for i, j, message in errors:
+            print(f"[ERROR] coint({data.columns[i]},{data.columns[j]}): {message}")
+
+        if use_cache and len(test_rows):
+            ok = ~np.isnan(tstats)  # don't cache failed tests
+            hedge, corr = pair_ols_stats(values, test_rows[ok], test_cols[ok])
+            store_pair_results({
+                key: (pvals[i, j], t, b, c)
+                for key, i, j, t, b, c in zip(np.asarray(keys)[todo][ok], test_rows[ok], test_cols[ok],
+                                              tstats[ok], hedge, corr)
+            })
+        if use_cache:
+            print(f"[DEBUG] p-value cache: {len(rows) - len(test_rows)} hits, {len(test_rows)} tested")
+
+        if candidates is not None and report_pruned:
+            elapsed = time.perf_counter() - started
+            total = n * (n - 1) // 2
+            pruned = total - len(rows)
+            saved = elapsed / max(1, len(rows)) * pruned
+            print(f"[INFO] pre-screen: tested {len(rows)} of {total} pairs, "
+                  f"pruned {pruned} (~{saved:.2f}s saved)")
+
+        pval_matrix.iloc[:, :] = pvals
+        for i, j in zip(rows, cols):
+            if pvals[i, j] < significance:
+                pairs.append((data.columns[i], data.columns[j], pvals[i, j]))
+        return pairs, pval_matrix
+
+    elif engine != "statsmodels":
+        raise ValueError(f"Unknown cointegration engine: {engine}")
 
     for i in range(n):
         for j in range(i + 1, n):
@@ -36,16 +142,12 @@ def find_cointegrated_pairs(data, significance=0.05):
 
 def get_hedge_ratio(y, x):
     """
-    Calculate hedge ratio (beta) using OLS regression.
+    Calculate hedge ratio (beta) using OLS regression with a constant.
     y = dependent series
     x = independent series
+    Closed form from hedge_engine; same beta as sm.OLS(y, add_constant(x)).
     """
-    x_const = sm.add_constant(x)
-    model = sm.OLS(y, x_const).fit()
-    # prefer name-based access; fall back to iloc
-    beta = model.params.get(x.name)
-    if beta is None:
-        beta = model.params.iloc[1]   # second coefficient
+    _, beta = pair_hedge_ratios(np.asarray(y, dtype=float), np.asarray(x, dtype=float))
     return beta
 
 
@@ -57,6 +159,23 @@ def calculate_spread(y, x, hedge_ratio):
     return y - hedge_ratio * x
 
 
+def calculate_kalman_spread(y, x, delta=DEFAULT_DELTA, obs_var=DEFAULT_OBS_VAR):
+    """
+    Dynamic alternative to get_hedge_ratio + calculate_spread: stream the
+    pair through a Kalman filter (see kalman_hedge) so beta and the
+    intercept adapt bar by bar.
+    Returns (spread, zscore, hedge_ratio) Series indexed like y; spread is
+    y - (alpha + beta * x) with the state known before each bar.
+    """
+    spread, zscore, beta, _ = KalmanHedge(1, delta=delta, obs_var=obs_var).run(
+        np.asarray(y, dtype=float)[:, None], np.asarray(x, dtype=float)[:, None]
+    )
+    index = y.index if hasattr(y, "index") else None
+    return (pd.Series(spread[:, 0], index=index),
+            pd.Series(zscore[:, 0], index=index),
+            pd.Series(beta[:, 0], index=index))
+
+
 def calculate_rolling_mean_std(spread, window=5):
     n = spread.dropna().shape[0]
     if n < window:
@@ -65,87 +184,25 @@ def calculate_rolling_mean_std(spread, window=5):
         print(f"[WARN] requested window={window} larger than data length={n}. Using window={eff_window}.")
     else:
         eff_window = window
-    rolling_mean = spread.rolling(window=eff_window).mean()
-    rolling_std  = spread.rolling(window=eff_window).std()
-    return rolling_mean, rolling_std
+    return rolling_mean_std(spread, window=eff_window)
 
 def calculate_zscore(spread, rolling_mean, rolling_std):
     return (spread - rolling_mean) / rolling_std
 
 def generate_signals(spread, zscore):
-    signals = []
-    position = None  # NONE, BUY_Y_SELL_X or SELL_Y_BUY_X
-
-    for i in range(len(zscore)):
-        z = zscore.iloc[i] if hasattr(zscore, "iloc") else zscore[i]
-
-        if z > 2 and position != "SELL_Y_BUY_X":
-            signals.append("SELL_Y_BUY_X")
-            position = "SELL_Y_BUY_X"
-
-        elif z < -2 and position != "BUY_Y_SELL_X":
-            signals.append("BUY_Y_SELL_X")
-            position = "BUY_Y_SELL_X"
-
-        elif position is not None and abs(z) < 0.5:
-            signals.append("EXIT")
-            position = None
-
-        else:
-            signals.append(None)
+    """
+    Entry/exit labels per bar: "SELL_Y_BUY_X" when z > 2, "BUY_Y_SELL_X"
+    when z < -2, "EXIT" once |z| < 0.5 while in a position, else None.
+    Thin wrapper over signal_engine.band_signals, which also takes a 2-D
+    (time x pairs) z-score array and returns integer codes.
+    """
+    signals, _ = band_signals(np.asarray(zscore, dtype=float), entry=2.0, exit=0.5)
+    return signal_labels(signals)
 
-    return signals
 def backtest_pair(y_prices, x_prices, signals, dates, stock1, stock2):
-    trades = []
-    position = None
-    entry_y = entry_x = entry_date = None
-
-    for i in range(len(signals)):
-        signal = signals[i]
-
-        # ✅ BUY Y SELL X
-        if signal == "BUY_Y_SELL_X" and position is None:
-            position = "BUY_Y_SELL_X"
-            entry_y = y_prices[i]
-            entry_x = x_prices[i]
-            entry_date = dates[i]
-
-        # ✅ SELL Y BUY X
-        elif signal == "SELL_Y_BUY_X" and position is None:
-            position = "SELL_Y_BUY_X"
-            entry_y = y_prices[i]
-            entry_x = x_prices[i]
-            entry_date = dates[i]
-
-        # ✅ EXIT CONDITION
-        elif signal == "EXIT" and position is not None:
-            exit_y = y_prices[i]
-            exit_x = x_prices[i]
-            exit_date = dates[i]
-
-            # PnL calculation remains same
-            if position == "BUY_Y_SELL_X":
-                pnl = (exit_y - entry_y) - (exit_x - entry_x)
-            else:  # SELL_Y_BUY_X
-                pnl = (entry_y - exit_y) + (entry_x - exit_x)
-
-            trades.append({
-                "date_entry": entry_date.strftime("%Y-%m-%d"),
-                "date_exit": exit_date.strftime("%Y-%m-%d"),
-                "stock_buy": stock1 if position == "BUY_Y_SELL_X" else stock2,
-                "stock_sell": stock2 if position == "BUY_Y_SELL_X" else stock1,
-                "entry_y": entry_y,
-                "entry_x": entry_x,
-                "exit_y": exit_y,
-                "exit_x": exit_x,
-                "pnl": pnl
-            })
-
-            position = None
-            entry_y = entry_x = entry_date = None
-
-    return trades
-
-
-
-
+    """
+    Trades of generate_signals labels on one pair: enter on BUY_Y_SELL_X /
+    SELL_Y_BUY_X when flat, close on EXIT; pnl is per unit of each stock.
+    Built from the compact records of trade_records.pair_trade_records.
+    """
+    return records_to_rows(pair_trade_records(y_prices, x_prices, signals, dates), stock1, stock2)
@@ -1,43 +1,242 @@
 import os
+import io
+import csv
+from datetime import datetime
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 
-def load_and_merge_data(data_path='data'):
-    merged_df = None
-    files = os.listdir(data_path)
-
-    for file in files:
-        if file.endswith('.csv'):
-            file_path = os.path.join(data_path, file)
-            df = pd.read_csv(file_path)
-            df.columns = df.columns.str.strip()  # Remove extra spaces
-            df['Date'] = pd.to_datetime(df['Date'], dayfirst=True, errors='coerce')
-            df = df.dropna(subset=['Date'])  # Drop bad date rows
-
-
-            # Extract stock name from filename
-            stock_name = file.split('-')[2].upper()  # Example: INFY, TCS
-
-            # Find the close price column
-            close_col = None
-            for col in df.columns:
-                if col.strip().lower() in ['close price', 'close']:
-                    close_col = col
-                    break
-            if close_col is None:
-                raise ValueError(f"Close price column not found in {file}")
-
-            # Remove commas and convert to float
-            df[close_col] = df[close_col].astype(str).str.replace(',', '').astype(float)
-
-            df = df[['Date', close_col]]
-            df.rename(columns={close_col: stock_name}, inplace=True)
-
-            if merged_df is None:
-                merged_df = df
-            else:
-                merged_df = pd.merge(merged_df, df, on='Date', how='inner')
-
-    # ✅ Set 'Date' as index
-    merged_df.set_index('Date', inplace=True)
-    
-    return merged_df
+from .alignment import align_to_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+except ImportError:  # fall back to the pandas C parser
+    pacsv = None
+
+# NSE quote exports use e.g. 14-Jul-2025
+DATE_FORMAT = "%d-%b-%Y"
+CLOSE_COLUMNS = ("close", "close price")
+# below this many files a process pool costs more than it saves
+MIN_FILES_FOR_POOL = 64
+# bytes read from the end of an ascending file when looking for new rows
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def _find_columns(path):
+    """Return the raw (unstripped) date and close column names of a quote CSV."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+
+    date_col = close_col = None
+    for col in header:
+        key = col.strip().lower()
+        if key == "date" and date_col is None:
+            date_col = col
+        elif key in CLOSE_COLUMNS and close_col is None:
+            close_col = col
+    return date_col, close_col
+
+
+def _parse_row(row, date_idx, close_idx):
+    """Parse (date, close) from one raw CSV row; date is None if unparseable."""
+    try:
+        raw_date = row[date_idx].strip()
+    except IndexError:
+        return None, np.nan
+    try:
+        date = datetime.strptime(raw_date, DATE_FORMAT)
+    except ValueError:
+        date = pd.to_datetime(raw_date, dayfirst=True, errors="coerce")
+        if pd.isna(date):
+            return None, np.nan
+    try:
+        close = float(row[close_idx].replace(",", ""))
+    except (IndexError, ValueError):
+        close = np.nan
+    return np.datetime64(date, "ns"), close
+
+
+def _parse_dates(raw):
+    """Parse date strings with DATE_FORMAT, falling back to dayfirst inference."""
+    dates = pd.to_datetime(raw, format=DATE_FORMAT, errors="coerce")
+    if dates.isna().all():
+        dates = pd.to_datetime(raw, dayfirst=True, errors="coerce")
+    return dates
+
+
+def parse_quote_file(path):
+    """
+    Parse the date and close columns of one quote CSV.
+
+    Only the two needed columns are read, dates are parsed with an explicit
+    format and thousands separators are stripped in one vectorized pass.
+    Uses the pyarrow CSV reader when available.
+
+    Returns (dates, closes) as sorted datetime64[ns] / float64 arrays with
+    duplicate dates dropped, or None if the file has no date/close column.
+    """
+    date_col, close_col = _find_columns(path)
+    if date_col is None or close_col is None:
+        return None
+
+    if pacsv is not None:
+        table = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(
+            include_columns=[date_col, close_col],
+            column_types={date_col: pa.string(), close_col: pa.string()},
+        ))
+        dates = pc.strptime(table.column(0), format=DATE_FORMAT, unit="s", error_is_null=True)
+        if dates.null_count == len(dates):
+            dates = _parse_dates(table.column(0).to_pandas())
+        else:
+            dates = pd.DatetimeIndex(dates.to_numpy(zero_copy_only=False))
+        closes = pc.replace_substring(table.column(1), ",", "")
+        closes = pd.to_numeric(closes.to_pandas(), errors="coerce").to_numpy(dtype=np.float64)
+    else:
+        df = pd.read_csv(path, usecols=[date_col, close_col], thousands=",",
+                         dtype={date_col: str}, encoding="utf-8-sig")
+        dates = _parse_dates(df[date_col])
+        closes = pd.to_numeric(df[close_col], errors="coerce").to_numpy(dtype=np.float64)
+
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    valid = ~np.isnat(dates)
+    dates, closes = dates[valid], closes[valid]
+
+    order = np.argsort(dates, kind="stable")
+    dates, closes = dates[order], closes[order]
+    keep = np.ones(len(dates), dtype=bool)
+    keep[1:] = dates[1:] != dates[:-1]
+    return dates[keep], closes[keep]
+
+
+def parse_quote_rows_after(path, after):
+    """
+    Parse only the rows of one quote CSV dated strictly after `after`.
+
+    NSE exports list the newest bar first, so rows are read from the top
+    until a date <= after is reached. Files in ascending order are read
+    backwards from a block at the end of the file instead; if that block
+    holds only new rows the whole file is parsed and filtered.
+
+    Returns (dates, closes) like parse_quote_file, or None if the file has no
+    date/close column.
+    """
+    date_col, close_col = _find_columns(path)
+    if date_col is None or close_col is None:
+        return None
+    after = np.datetime64(after, "ns")
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        date_idx, close_idx = header.index(date_col), header.index(close_col)
+
+        rows = []
+        for row in reader:
+            date, close = _parse_row(row, date_idx, close_idx)
+            if date is None:
+                continue
+            if date <= after:
+                break
+            rows.append((date, close))
+
+    if not rows:
+        with open(path, "rb") as f:
+            f.seek(0, io.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - TAIL_BLOCK_SIZE))
+            block = f.read().decode("utf-8-sig", errors="replace")
+
+        # drop the header, or a first line cut in half by the seek
+        lines = block.splitlines()[1:]
+
+        reached_old = False
+        for row in csv.reader(reversed(lines)):
+            date, close = _parse_row(row, date_idx, close_idx)
+            if date is None:
+                continue
+            if date <= after:
+                reached_old = True
+                break
+            rows.append((date, close))
+
+        if not reached_old and size > TAIL_BLOCK_SIZE:
+            dates, closes = parse_quote_file(path)
+            new = dates > after
+            return dates[new], closes[new]
+
+    if not rows:
+        return np.array([], dtype="datetime64[ns]"), np.array([], dtype=np.float64)
+
+    rows.sort(key=lambda r: r[0])  # stable: keeps the first duplicate seen
+    dates = np.array([r[0] for r in rows], dtype="datetime64[ns]")
+    closes = np.array([r[1] for r in rows], dtype=np.float64)
+    keep = np.ones(len(dates), dtype=bool)
+    keep[1:] = dates[1:] != dates[:-1]
+    return dates[keep], closes[keep]
+
+
+def load_quote_files(paths, workers=None):
+    """
+    Parse many quote CSVs with parse_quote_file, fanning out over a process
+    pool for large universes. workers=1 forces serial parsing.
+
+    Returns a list of (dates, closes) or None, in the same order as paths.
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(paths) < MIN_FILES_FOR_POOL:
+        return [parse_quote_file(p) for p in paths]
+
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_quote_file, paths, chunksize=chunksize))
+
+
+def stock_name_from_path(path):
+    """
+    Ticker name used by the API and the snapshot, e.g.
+    Quote-Equity-INFY-EQ-15-07-2024-to-15-07-2025.csv -> INFY
+    """
+    stock_name = os.path.basename(path).replace("Quote-Equity-", "").replace(".csv", "")
+    return stock_name.split("-EQ")[0]
+
+
+def loader_stock_name(path):
+    """
+    Column name load_and_merge_data gives a quote file, e.g.
+    Quote-Equity-RAMCOSYS-BE-15-07-2024-to-15-07-2025.csv -> RAMCOSYS
+    """
+    return os.path.basename(path).split('-')[2].upper()
+
+
+def load_and_merge_data(data_path='data', snapshot_path=None, workers=None):
+    """
+    Inner-join the close prices of every quote CSV in data_path on Date.
+    If snapshot_path is given (see snapshot.default_snapshot_path) and the
+    snapshot is newer than the CSVs it is opened instead of parsing text.
+    Columns are named by loader_stock_name either way.
+    """
+    files = [f for f in os.listdir(data_path)
+             if f.endswith('.csv') and f.startswith('Quote-Equity')]
+
+    if snapshot_path is not None:
+        # snapshots need pyarrow; the CSV path below works without it
+        from .snapshot import read_snapshot, snapshot_is_fresh
+        if snapshot_is_fresh(snapshot_path, data_path):
+            merged_df = read_snapshot(snapshot_path, how="inner", index_name="Date")
+            # the snapshot is written with the API's ticker names
+            return merged_df.rename(columns={stock_name_from_path(f): loader_stock_name(f) for f in files})
+
+    parsed = load_quote_files([os.path.join(data_path, f) for f in files], workers=workers)
+
+    for file, result in zip(files, parsed):
+        if result is None:
+            raise ValueError(f"Close price column not found in {file}")
+
+    # Extract stock name from filename, e.g. INFY, TCS
+    names = [loader_stock_name(file) for file in files]
+
+    # ✅ Single-pass inner join on 'Date', which becomes the index
+    return align_to_frame(parsed, names, how="inner", index_name="Date")
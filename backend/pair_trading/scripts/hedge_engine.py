@@ -0,0 +1,113 @@
+import numpy as np
+
+
+def _as_columns(a):
+    a = np.asarray(a, dtype=np.float64)
+    return a[:, None] if a.ndim == 1 else a
+
+
+def _column_means(a, mask):
+    return np.where(mask, a, 0.0).sum(axis=0) / np.maximum(mask.sum(axis=0), 1)
+
+
+def pair_hedge_ratios(y, x):
+    """
+    OLS intercept and slope of y on x (with constant) for many pairs at
+    once: y and x are (T,) or (T, pairs) arrays, regressed column by column
+    over the rows where both are present. Equivalent to
+    sm.OLS(y, sm.add_constant(x)).fit().params, from centred sums.
+
+    Returns (intercepts, betas), scalars for 1-D input.
+    """
+    squeeze = np.ndim(y) == 1
+    y, x = _as_columns(y), _as_columns(x)
+    mask = np.isfinite(y) & np.isfinite(x)
+    count = mask.sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y_mean = np.where(mask, y, 0.0).sum(axis=0) / count
+        x_mean = np.where(mask, x, 0.0).sum(axis=0) / count
+        yc, xc = np.where(mask, y - y_mean, 0.0), np.where(mask, x - x_mean, 0.0)
+        betas = np.einsum("tp,tp->p", xc, yc) / np.einsum("tp,tp->p", xc, xc)
+    intercepts = y_mean - betas * x_mean
+    if squeeze:
+        return intercepts[0], betas[0]
+    return intercepts, betas
+
+
+def hedge_ratio_matrix(values):
+    """
+    Intercepts and hedge ratios of every column on every other column of a
+    (T, n) price matrix, with [i, j] the regression of column i on column j
+    over the rows where both are present.
+
+    All pairwise means, variances and covariances come out of four (n, n)
+    matrix products over the presence mask, so no pair is fitted on its own.
+
+    Returns (intercepts, betas), both (n, n).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mask = np.isfinite(values)
+    m = mask.astype(np.float64)
+    # centring on column means keeps the sums well conditioned
+    centre = _column_means(values, mask)
+    v = np.where(mask, values - centre, 0.0)
+
+    count = m.T @ m                  # [i, j] rows where both are present
+    sums = v.T @ m                   # [i, j] sum of column i over those rows
+    squares = (v * v).T @ m          # [i, j] sum of column i squared
+    cross = v.T @ v                  # [i, j] sum of column i times column j
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_y, mean_x = sums / count, sums.T / count
+        cov = cross - sums * sums.T / count
+        var_x = squares.T - sums.T * sums.T / count
+        betas = cov / var_x
+        intercepts = (mean_y + centre[:, None]) - betas * (mean_x + centre[None, :])
+    np.fill_diagonal(betas, 1.0)
+    np.fill_diagonal(intercepts, 0.0)
+    return intercepts, betas
+
+
+def rolling_hedge_ratios(y, x, window, min_periods=None):
+    """
+    Rolling OLS intercept and slope of y on x over the last `window` rows,
+    for (T,) or (T, pairs) arrays, like pandas rolling(window, min_periods).
+
+    Window sums of x, y, x*x and x*y are differences of cumulative sums, so
+    the cost is O(T) per pair whatever the window length. Rows with a missing
+    price are skipped; windows with fewer than min_periods (default window)
+    complete rows, or with constant x, are NaN.
+
+    Returns (intercepts, betas) arrays shaped like y.
+    """
+    squeeze = np.ndim(y) == 1
+    y, x = _as_columns(y), _as_columns(x)
+    min_periods = window if min_periods is None else min_periods
+    mask = np.isfinite(y) & np.isfinite(x)
+
+    # centre first so the running sums stay small
+    y_centre, x_centre = _column_means(y, mask), _column_means(x, mask)
+    yc = np.where(mask, y - y_centre, 0.0)
+    xc = np.where(mask, x - x_centre, 0.0)
+
+    def window_sum(a):
+        c = np.cumsum(a, axis=0)
+        c[window:] = c[window:] - c[:-window]
+        return c
+
+    n = window_sum(mask.astype(np.float64))
+    sx, sy = window_sum(xc), window_sum(yc)
+    sxx, sxy = window_sum(xc * xc), window_sum(xc * yc)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_x = sxx - sx * sx / n
+        betas = (sxy - sx * sy / n) / var_x
+        intercepts = (sy / n + y_centre) - betas * (sx / n + x_centre)
+    invalid = (n < max(min_periods, 1)) | ~(var_x > 0)
+    betas[invalid] = np.nan
+    intercepts[invalid] = np.nan
+
+    if squeeze:
+        return intercepts[:, 0], betas[:, 0]
+    return intercepts, betas
@@ -0,0 +1,288 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from .coint_engine import (
+    SQRTEPS, MAX_BLOCK_ELEMENTS, default_maxlag, mackinnon_pvalues,
+    select_lags_aic, adf_tstats_from_gram,
+)
+from .parallel_scan import scan_pairs
+
+# full rebuild after this many appended bars, to shed rounding error
+REFRESH_EVERY = 20
+# rebuild once a column's mean moves this many standard deviations away from
+# the centring offset chosen at the last rebuild
+DRIFT_TOL = 4.0
+
+# states kept at once, least recently used evicted first
+MAX_STATES = 2
+# above this size of F + G (which grows with the square of the ticker count)
+# no state is kept and the pairs are scanned with the batched engine
+MAX_STATE_BYTES = 256 * 2 ** 20
+
+# tuple(columns) -> _CointState, least recently used first
+_STATES = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def z_rows(values, clean, offset, maxlag, start, stop):
+    """
+    ADF regressor rows z[t] = [1, p[t-1], d[t], d[t-1], ..., d[t-maxlag]]
+    for t = start..stop-1, with p the centred prices of the clean columns
+    (0 elsewhere) and d their differences. Lags before t = 1 are filled with
+    0. Only the maxlag + 1 rows of values before start are read.
+    """
+    n, L = values.shape[1], maxlag
+    base = max(0, start - L - 1)
+    p = np.where(clean, values[base:stop] - offset, 0.0)
+    d = np.vstack([np.zeros((1, n)), np.diff(p, axis=0)])
+    Z = np.zeros((stop - start, 1 + n * (L + 2)))
+    Z[:, 0] = 1.0
+    Z[:, 1:1 + n] = p[start - 1 - base:stop - 1 - base]
+    for m in range(L + 1):
+        lo = max(start, m + 1)
+        if lo < stop:
+            Z[lo - start:, 1 + n * (m + 1):1 + n * (m + 2)] = d[lo - m - base:stop - m - base]
+    return Z
+
+
+def _pair_index(n, rows, cols, lag):
+    """Positions in z of [1, p_y, p_x, d_y, d_x, .., d_y[t-lag], d_x[t-lag]] per pair."""
+    idx = [np.zeros_like(rows), 1 + rows, 1 + cols]
+    for m in range(lag + 1):
+        idx += [1 + n * (m + 1) + rows, 1 + n * (m + 1) + cols]
+    return np.stack(idx, axis=1)
+
+
+def _adf_gram(blocks, a, b, lag):
+    """
+    Cross products of [de[t], e[t-1], de[t-1], .., de[t-lag]] for the
+    residual e = y - a - b x of each pair, from its (P, 2 lag + 5, 2 lag + 5)
+    sub-block of z cross products.
+    """
+    P, k = len(a), lag + 1
+    A = np.zeros((P, k + 1, 2 * k + 3))
+    A[:, 0, 3], A[:, 0, 4] = 1.0, -b                     # de[t]
+    A[:, 1, 0], A[:, 1, 1], A[:, 1, 2] = -a, 1.0, -b     # e[t-1]
+    for m in range(1, k):                                # de[t-m]
+        A[:, m + 1, 3 + 2 * m], A[:, m + 1, 4 + 2 * m] = 1.0, -b
+    W = A @ blocks @ A.transpose(0, 2, 1)
+    return W[:, 1:, 1:], W[:, 1:, 0], W[:, 0, 0]
+
+
+def gram_coint_stats(F, G, heads, T, maxlag, rows, cols):
+    """
+    Engle-Granger statistics of column rows[k] on cols[k] from sufficient
+    statistics over T observations: F = sum of f f' with f = [1, p[t]],
+    G = sum of z z' over the ADF common sample t = maxlag+1 .. T-1 and
+    heads = z[1..maxlag] (see z_rows). Same first stage, AIC lag selection
+    and refit as coint_engine.batched_coint.
+
+    Only the small per-pair sub-blocks of G are gathered; a lag-l refit
+    adds the per-pair cross products of heads[l:] to them, so G itself is
+    never copied.
+
+    Returns (tstats, hedge_ratios); near-collinear pairs get -inf.
+    """
+    n, L = F.shape[0] - 1, maxlag
+    tstats = np.full(len(rows), -np.inf)
+
+    # first stage: y on x with constant, from centred sums
+    sy, sx = F[0, 1 + rows], F[0, 1 + cols]
+    sxx = F[1 + cols, 1 + cols] - sx * sx / T
+    sxy = F[1 + rows, 1 + cols] - sx * sy / T
+    syy = F[1 + rows, 1 + rows] - sy * sy / T
+    b = sxy / sxx
+    a = (sy - b * sx) / T
+    rsquared = 1 - (syy - b * sxy) / syy
+    ok = np.flatnonzero(rsquared < 1 - 100 * SQRTEPS)
+    if not len(ok):
+        return tstats, b
+    a_ok, b_ok = a[ok], b[ok]
+
+    # lag selection on the common sample, then refit at the chosen lag
+    idx = _pair_index(n, rows[ok], cols[ok], L)
+    blocks = G[idx[:, :, None], idx[:, None, :]]
+    usedlag = select_lags_aic(*_adf_gram(blocks, a_ok, b_ok, L), T - 1 - L)
+    stats = np.empty(len(ok))
+    for lag in np.unique(usedlag):
+        sel = np.flatnonzero(usedlag == lag)
+        d = 2 * lag + 5
+        # (P, h, d) rows of heads[lag:] restricted to each pair's components
+        head = heads[lag:][:, idx[sel, :d]].transpose(1, 0, 2)
+        refit = blocks[sel, :d, :d] + head.transpose(0, 2, 1) @ head
+        stats[sel] = adf_tstats_from_gram(*_adf_gram(refit, a_ok[sel], b_ok[sel], lag), T - 1 - lag)
+    tstats[ok] = stats
+    return tstats, b
+
+
+class _CointState:
+    """
+    Sufficient statistics (see gram_coint_stats) for Engle-Granger tests of
+    every pair of "clean" (NaN-free, non-constant) columns of a price matrix,
+    with prices centred on per-column offsets.
+
+    A lag-l refit on t = l+1 .. T-1 is G plus the tail of heads, and every
+    per-pair cross product of the first stage and of the ADF regression at
+    any lag is a sub-block of F or G, so a new bar costs one rank-1 update.
+    """
+
+    def __init__(self, values, index):
+        T, n = values.shape
+        self.n = n
+        self.maxlag = default_maxlag(T)
+        self.clean = np.isfinite(values).all(axis=0) & (np.ptp(values, axis=0) > 0)
+        self.offset = np.where(self.clean, np.nan_to_num(values.mean(axis=0)), 0.0)
+        self.T = 0
+        self.index = index[:0]
+        self.last_row = None
+        self.since_rebuild = 0
+        self.pvals = self.tstats = self.errors = None
+
+        D = 1 + n * (self.maxlag + 2)
+        self.F = np.zeros((n + 1, n + 1))
+        self.G = np.zeros((D, D))
+        if self.maxlag >= 0:
+            self.heads = z_rows(values, self.clean, self.offset, self.maxlag, 1, self.maxlag + 1)
+        self._add_rows(values, index)
+        self.since_rebuild = 0
+
+    def _add_rows(self, values, index):
+        """Fold rows T_old..T-1 of the full values matrix into F and G."""
+        T_old, T = self.T, values.shape[0]
+        f = np.hstack([np.ones((T - T_old, 1)), np.where(self.clean, values[T_old:] - self.offset, 0.0)])
+        self.F += f.T @ f
+
+        start = max(T_old, self.maxlag + 1)
+        if self.maxlag >= 0 and start < T:
+            Z = z_rows(values, self.clean, self.offset, self.maxlag, start, T)
+            self.G += Z.T @ Z
+
+        self.T = T
+        self.index = index
+        self.last_row = values[-1].copy()
+        self.since_rebuild += T - T_old
+        self.pvals = None
+
+    def extends(self, values, index):
+        """True if values is this state's data with rows appended."""
+        T = self.T
+        return (values.shape[1] == self.n and values.shape[0] >= T and T > 0
+                and index[:T].equals(self.index)
+                and np.array_equal(values[T - 1], self.last_row, equal_nan=True))
+
+    def needs_rebuild(self, values):
+        T = values.shape[0]
+        new = values[self.T:, self.clean]
+        if not np.isfinite(new).all() or default_maxlag(T) != self.maxlag:
+            return True
+        if self.since_rebuild + T - self.T > REFRESH_EVERY:
+            return True
+
+        # centring drift, measured after folding in the new rows
+        p = np.where(self.clean, values[self.T:] - self.offset, 0.0)
+        count = T
+        sums = self.F[0, 1:] + p.sum(axis=0)
+        squares = np.diag(self.F)[1:] + (p * p).sum(axis=0)
+        mean = sums / count
+        std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+        return bool(np.any(np.abs(mean[self.clean]) > DRIFT_TOL * std[self.clean]))
+
+    def results(self, values):
+        """(pvals, tstats, errors) for all pairs i < j, computed once per state."""
+        if self.pvals is not None:
+            return self.pvals, self.tstats, self.errors
+
+        n = self.n
+        rows, cols = np.triu_indices(n, k=1)
+        pvals = np.ones((n, n))
+        tstats = np.full((n, n), np.nan)
+        fast = self.clean[rows] & self.clean[cols] if self.maxlag >= 0 else np.zeros(len(rows), dtype=bool)
+
+        d = 2 * self.maxlag + 5
+        block = max(1, MAX_BLOCK_ELEMENTS // (d * d))
+        fast_rows, fast_cols = rows[fast], cols[fast]
+        for start in range(0, len(fast_rows), block):
+            i, j = fast_rows[start:start + block], fast_cols[start:start + block]
+            tstats[i, j], _ = gram_coint_stats(self.F, self.G, self.heads, self.T, self.maxlag, i, j)
+            pvals[i, j] = mackinnon_pvalues(tstats[i, j], regression="c", N=2)
+
+        # pairs with missing or constant prices go through coint() each time
+        i, j = rows[~fast], cols[~fast]
+        pvals[i, j], tstats[i, j], errors = scan_pairs(values, i, j, engine="statsmodels")
+
+        self.pvals, self.tstats, self.errors = pvals, tstats, errors
+        return pvals, tstats, errors
+
+
+def state_bytes(T, n):
+    """Size of the F and G matrices of a _CointState over T bars of n tickers."""
+    D = 1 + n * (default_maxlag(T) + 2)
+    return 8 * (D * D + (n + 1) ** 2)
+
+
+def _batched_pvalue_matrix(values):
+    """(pvals, tstats, errors) of all pairs i < j from one batched scan, keeping no state."""
+    n = values.shape[1]
+    rows, cols = np.triu_indices(n, k=1)
+    pvals = np.ones((n, n))
+    tstats = np.full((n, n), np.nan)
+    pvals[rows, cols], tstats[rows, cols], errors = scan_pairs(values, rows, cols, engine="batched")
+    return pvals, tstats, errors
+
+
+def incremental_pvalue_matrix(data):
+    """
+    Upper-triangle Engle-Granger p-values for all column pairs of data, like
+    coint_engine.coint_pvalue_matrix, kept up to date as bars are appended.
+
+    State is kept per set of columns. If data is the previous call's data
+    with new rows at the end, the new rows are folded into the per-pair
+    sufficient statistics in O(1) per pair per bar and the tests are re-run
+    from those; otherwise (and every REFRESH_EVERY bars, when Schwert's
+    maxlag changes, when new prices are missing, or when prices drift too far
+    from the centring offsets) everything is rebuilt from scratch.
+
+    At most MAX_STATES column sets are tracked (least recently used dropped
+    first), and universes whose state would exceed MAX_STATE_BYTES are
+    scanned with the batched engine on every call instead.
+
+    Returns (pvals, tstats, errors) like parallel_scan.parallel_pvalue_matrix.
+    """
+    values = data.to_numpy(dtype=float)
+    index = data.index
+    key = tuple(data.columns)
+
+    if state_bytes(*values.shape) > MAX_STATE_BYTES:
+        print(f"[WARN] incremental coint: state for {values.shape[1]} tickers exceeds "
+              f"MAX_STATE_BYTES; using the batched engine")
+        return _batched_pvalue_matrix(values)
+
+    with _LOCK:
+        state = _STATES.get(key)
+        if state is not None and state.extends(values, index):
+            if values.shape[0] > state.T:
+                if state.needs_rebuild(values):
+                    print("[DEBUG] incremental coint: scheduled rebuild")
+                    state = None
+                else:
+                    print(f"[DEBUG] incremental coint: appending {values.shape[0] - state.T} bars")
+                    state._add_rows(values, index)
+        else:
+            state = None
+
+        if state is None:
+            # free the stale state (and the least recently used ones) first
+            _STATES.pop(key, None)
+            while len(_STATES) >= MAX_STATES:
+                _STATES.popitem(last=False)
+            state = _CointState(values, index)
+            _STATES[key] = state
+        _STATES.move_to_end(key)
+        return state.results(values)
+
+
+def clear_incremental_state():
+    """Forget all incremental cointegration state."""
+    with _LOCK:
+        _STATES.clear()
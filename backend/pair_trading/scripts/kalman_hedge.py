@@ -0,0 +1,73 @@
+import numpy as np
+
+DEFAULT_DELTA = 1e-4
+DEFAULT_OBS_VAR = 1e-3
+
+
+class KalmanHedge:
+    """
+    Streaming Kalman filter for a dynamic hedge ratio and intercept,
+    y[t] = alpha[t] + beta[t] * x[t] + noise, for many pairs at once.
+
+    (beta, alpha) follow a random walk with variance delta / (1 - delta) per
+    bar and the observation noise variance is obs_var. Both are relative to
+    prices rescaled by each series' first price, so the defaults work for
+    any price level; the filter starts from beta = 1, alpha = 0 on that
+    scale. The state per pair is the 2-vector (beta, alpha), its 2x2
+    covariance and the two scale factors.
+    """
+
+    def __init__(self, n_pairs, delta=DEFAULT_DELTA, obs_var=DEFAULT_OBS_VAR):
+        self.trans_var = delta / (1 - delta)
+        self.obs_var = obs_var
+        self.theta = np.zeros((n_pairs, 2))
+        self.theta[:, 0] = 1.0
+        self.cov = np.zeros((n_pairs, 2, 2))
+        self.scale_y = np.full(n_pairs, np.nan)
+        self.scale_x = np.full(n_pairs, np.nan)
+
+    def update(self, y, x):
+        """
+        Feed one bar of prices (arrays of length n_pairs). Pairs with a
+        missing price keep their state and get NaN outputs.
+
+        Returns (spread, zscore, beta, alpha) in price units, where spread is
+        y minus the predicted y from the state before this bar and zscore is
+        that spread over its predicted standard deviation.
+        """
+        y = np.asarray(y, dtype=np.float64)
+        x = np.asarray(x, dtype=np.float64)
+        live = np.isfinite(y) & np.isfinite(x)
+        first = live & np.isnan(self.scale_y)
+        self.scale_y[first], self.scale_x[first] = y[first], x[first]
+
+        ys = np.where(live, y / self.scale_y, 0.0)
+        h = np.stack([np.where(live, x / self.scale_x, 0.0), np.ones(len(y))], axis=1)
+
+        # predict, then correct with this bar's price
+        R = self.cov + self.trans_var * np.eye(2)
+        Rh = np.einsum("pij,pj->pi", R, h)
+        Q = np.einsum("pi,pi->p", h, Rh) + self.obs_var
+        e = ys - np.einsum("pi,pi->p", h, self.theta)
+        K = Rh / Q[:, None]
+
+        self.theta = np.where(live[:, None], self.theta + K * e[:, None], self.theta)
+        self.cov = np.where(live[:, None, None], R - K[:, :, None] * Rh[:, None, :], self.cov)
+
+        spread = np.where(live, e * self.scale_y, np.nan)
+        zscore = np.where(live, e / np.sqrt(Q), np.nan)
+        beta = np.where(live, self.theta[:, 0] * self.scale_y / self.scale_x, np.nan)
+        alpha = np.where(live, self.theta[:, 1] * self.scale_y, np.nan)
+        return spread, zscore, beta, alpha
+
+    def run(self, Y, X):
+        """
+        Stream (T, n_pairs) price arrays through update, bar by bar.
+        Returns (spread, zscore, beta, alpha) arrays of shape (T, n_pairs).
+        """
+        Y = np.asarray(Y, dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        out = np.empty((4,) + Y.shape)
+        for t in range(Y.shape[0]):
+            out[:, t] = self.update(Y[t], X[t])
+        return out[0], out[1], out[2], out[3]
@@ -0,0 +1,125 @@
+import math
+from array import array
+
+from .signal_engine import SIGNAL_NONE, SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_EXIT, SIGNAL_LABELS
+
+# re-sum the ring buffer after this many windows' worth of ticks, so the
+# add/remove running sums never drift
+RESUM_WINDOWS = 50
+
+
+class OnlinePairState:
+    """
+    Live state of one pair for bar-by-bar signals: a ring buffer of the last
+    `window` spreads with running sums, the hedge ratio and the
+    generate_signals position (1 long spread, -1 short spread, 0 flat).
+
+    update() costs O(1) per tick and reproduces, bar by bar, the API's
+    spread.rolling(window, min_periods=1) mean/std, z-score and
+    generate_signals labels. Sums are kept relative to the first spread
+    seen, and re-summed from the buffer every RESUM_WINDOWS windows.
+    Uses __slots__ and an array('d') buffer, so thousands of pairs take a
+    few hundred bytes each.
+    """
+
+    __slots__ = ("hedge_ratio", "window", "entry", "exit", "position",
+                 "_buffer", "_head", "_seen", "_count", "_sum", "_sumsq",
+                 "_shift", "_last", "_run", "_since_resum")
+
+    def __init__(self, hedge_ratio, window=20, entry=2.0, exit=0.5):
+        self.hedge_ratio = float(hedge_ratio)
+        self.window = window
+        self.entry = entry
+        self.exit = exit
+        self.position = 0
+        self._buffer = array("d", [math.nan]) * window
+        self._head = 0          # next slot to overwrite
+        self._seen = 0          # ticks so far, capped at window
+        self._count = 0         # finite spreads in the window
+        self._sum = 0.0         # sum of (spread - shift) over the window
+        self._sumsq = 0.0
+        self._shift = None
+        self._last = math.nan
+        self._run = 0           # identical finite spreads ending at the last tick
+        self._since_resum = 0
+
+    def _resum(self):
+        values = [v - self._shift for v in self._buffer if not math.isnan(v)]
+        self._sum = math.fsum(values)
+        self._sumsq = math.fsum(v * v for v in values)
+        self._since_resum = 0
+
+    def update(self, y_price, x_price):
+        """
+        Feed one bar. Returns (spread, mean, std, zscore, signal), signal
+        being the generate_signals label (None, "BUY_Y_SELL_X",
+        "SELL_Y_BUY_X" or "EXIT").
+        """
+        spread = y_price - self.hedge_ratio * x_price
+        finite = not math.isnan(spread)
+        if finite and self._shift is None:
+            self._shift = spread
+
+        # slide the window: drop the oldest bar, add this one
+        if self._seen == self.window:
+            old = self._buffer[self._head]
+            if not math.isnan(old):
+                d = old - self._shift
+                self._sum -= d
+                self._sumsq -= d * d
+                self._count -= 1
+        else:
+            self._seen += 1
+        self._buffer[self._head] = spread
+        self._head = (self._head + 1) % self.window
+
+        if finite:
+            d = spread - self._shift
+            self._sum += d
+            self._sumsq += d * d
+            self._count += 1
+            self._run = self._run + 1 if spread == self._last else 1
+        else:
+            self._run = 0
+        self._last = spread
+
+        self._since_resum += 1
+        if self._since_resum >= RESUM_WINDOWS * self.window and self._shift is not None:
+            self._resum()
+
+        n = self._count
+        mean = self._shift + self._sum / n if n else math.nan
+        if n >= 2:
+            var = 0.0 if self._run >= n else max(self._sumsq - self._sum * self._sum / n, 0.0) / (n - 1)
+            std = math.sqrt(var)
+        else:
+            std = math.nan
+
+        if not finite or math.isnan(std):
+            zscore = math.nan
+        elif std == 0.0:
+            zscore = math.copysign(math.inf, spread - mean) if spread != mean else math.nan
+        else:
+            zscore = (spread - mean) / std
+
+        return spread, mean, std, zscore, SIGNAL_LABELS[self._step(zscore)]
+
+    def _step(self, z):
+        """One step of the generate_signals state machine; returns the signal code."""
+        if z > self.entry and self.position != -1:
+            self.position = -1
+            return SIGNAL_SHORT
+        if z < -self.entry and self.position != 1:
+            self.position = 1
+            return SIGNAL_LONG
+        if self.position != 0 and abs(z) < self.exit:
+            self.position = 0
+            return SIGNAL_EXIT
+        return SIGNAL_NONE
+
+    def warm_up(self, y_prices, x_prices):
+        """Replay history bar by bar; returns the last update's result."""
+        result = None
+        for y_price, x_price in zip(y_prices, x_prices):
+            result = self.update(y_price, x_price)
+        return result
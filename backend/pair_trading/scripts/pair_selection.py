@@ -1,6 +1,14 @@
+import time
 import numpy as np
 import pandas as pd
 
+from .cointegration_utils import find_cointegrated_pairs
+
+def pair_score(pval, corr):
+    """Strength of a pair: -log(p-value) scaled by |correlation|."""
+    safe_pval = max(pval, 1e-8)
+    return (-np.log(safe_pval)) * abs(corr)
+
 def get_top_n_pairs(data, pval_matrix, n=1):
     pairs_scores = []
     stocks = data.columns
@@ -42,7 +50,8 @@ def find_best_pair_within_subset(data, anchor_stock, selected_stocks, pval_matri
         if stock == anchor_stock:
             continue
 
-        pval = pval_matrix.loc[anchor_stock, stock]
+        # pval_matrix only fills the upper triangle (stock1 tested on stock2)
+        pval = min(pval_matrix.loc[anchor_stock, stock], pval_matrix.loc[stock, anchor_stock])
         if pval >= 0.10:  # relax threshold for small subsets
             continue
 
@@ -50,8 +59,7 @@ def find_best_pair_within_subset(data, anchor_stock, selected_stocks, pval_matri
         if pd.isnull(corr) or corr == 0:
             continue
 
-        safe_pval = max(pval, 1e-8)
-        score = (-np.log(safe_pval)) * abs(corr)
+        score = pair_score(pval, corr)
 
         pairs_scores.append((anchor_stock, stock, pval, corr, score))
 
@@ -69,3 +77,93 @@ def find_best_pair_within_subset(data, anchor_stock, selected_stocks, pval_matri
         "score": best[4],
     }
 
+
+def prescreen_pairs(data, top_k=10, method="correlation"):
+    """
+    Cheap pre-screen to prune the pair search before cointegration testing.
+
+    method="correlation" computes the full correlation matrix and
+    method="distance" the sum of squared differences between prices
+    normalized to their first value, each in one vectorized call. For every
+    ticker only its top_k most similar partners are kept.
+
+    Returns (candidates, report): candidates is a list of (stock1, stock2)
+    tuples for find_cointegrated_pairs(candidates=...), report holds the
+    number of pairs kept and pruned and the pre-screen time.
+    """
+    started = time.perf_counter()
+    stocks = data.columns
+    n = len(stocks)
+    values = data.to_numpy(dtype=float)
+
+    if method == "correlation":
+        if np.isnan(values).any():
+            score = data.corr().to_numpy()
+        else:
+            score = np.corrcoef(values, rowvar=False)
+    elif method == "distance":
+        values = values[np.isfinite(values).all(axis=1)]
+        norm = values / values[0] if len(values) else values
+        sq = np.einsum("tn,tn->n", norm, norm)
+        ssd = sq[:, None] + sq[None, :] - 2 * norm.T @ norm
+        score = -ssd  # smaller distance = more similar
+    else:
+        raise ValueError(f"Unknown pre-screen method: {method}")
+
+    score = np.where(np.isnan(score), -np.inf, score)
+    np.fill_diagonal(score, -np.inf)
+
+    k = min(top_k, n - 1)
+    candidates = []
+    if k > 0:
+        partners = np.argpartition(-score, k - 1, axis=1)[:, :k]
+        rows = np.repeat(np.arange(n), k)
+        cols = partners.ravel()
+        keep = np.isfinite(score[rows, cols])
+        a, b = np.minimum(rows, cols)[keep], np.maximum(rows, cols)[keep]
+        codes = np.unique(a * n + b)
+        candidates = [(stocks[c // n], stocks[c % n]) for c in codes]
+
+    total = n * (n - 1) // 2
+    report = {
+        "method": method,
+        "top_k": top_k,
+        "total_pairs": total,
+        "kept_pairs": len(candidates),
+        "pruned_pairs": total - len(candidates),
+        "prescreen_seconds": time.perf_counter() - started,
+    }
+    print(f"[DEBUG] Pre-screen ({method}, top_k={top_k}): kept {len(candidates)} "
+          f"of {total} pairs in {report['prescreen_seconds']:.3f}s")
+    return candidates, report
+
+
+def find_anchor_pairs(data, anchor_stock, engine="batched", use_cache=False):
+    """
+    Anchor-centric search: test anchor_stock against every other column of
+    data only, i.e. n-1 cointegration tests instead of n(n-1)/2. Each pair is
+    tested in column order, exactly as find_cointegrated_pairs would.
+
+    Returns (results, pval_matrix): results holds (anchor, stock, pval, corr,
+    score) for every tested pair, best score first (same scoring as
+    find_best_pair_within_subset); pval_matrix is filled for anchor pairs only.
+    """
+    if anchor_stock not in data.columns:
+        raise ValueError("Anchor stock must be part of data")
+
+    others = [s for s in data.columns if s != anchor_stock]
+    _, pval_matrix = find_cointegrated_pairs(
+        data, significance=1.0, engine=engine, use_cache=use_cache,
+        candidates=[(anchor_stock, s) for s in others], report_pruned=False,
+    )
+    corrs = data[others].corrwith(data[anchor_stock])
+
+    results = []
+    for stock in others:
+        pval = min(pval_matrix.loc[anchor_stock, stock], pval_matrix.loc[stock, anchor_stock])
+        corr = corrs[stock]
+        score = pair_score(pval, corr) if pd.notnull(corr) else 0.0
+        results.append((anchor_stock, stock, pval, corr, score))
+
+    results.sort(key=lambda x: x[4], reverse=True)
+    return results, pval_matrix
@@ -0,0 +1,142 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from statsmodels.tsa.stattools import coint
+
+from .coint_engine import batched_coint
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# per-worker view of the shared price matrix, set by _attach
+_SHM = None
+_VALUES = None
+_PAIRS = None
+
+
+def _attach(name, shape, pairs):
+    """Pool initializer: map the parent's price matrix without copying it."""
+    global _SHM, _VALUES, _PAIRS
+    _SHM = shared_memory.SharedMemory(name=name)
+    _VALUES = np.ndarray(shape, dtype=np.float64, buffer=_SHM.buf)
+    _PAIRS = pairs
+
+
+def shared_values():
+    """The price matrix a pool worker was attached to by _attach."""
+    return _VALUES
+
+
+def _pair_index(n, start, stop):
+    """
+    (i, j) for upper-triangle pairs start..stop-1 in row-major i < j order,
+    decoded in closed form so no worker builds the full triangle.
+    """
+    k = np.arange(start, stop, dtype=np.int64)
+    # pairs before row i: i * (2n - i - 1) / 2
+    i = (n - 2 - np.floor(np.sqrt(4.0 * n * (n - 1) - 8.0 * k - 7) / 2 - 0.5)).astype(np.int64)
+    before = i * (2 * n - i - 1) // 2
+    # guard against floating point error at row boundaries
+    i = np.where(before > k, i - 1, i)
+    before = i * (2 * n - i - 1) // 2
+    nxt = (i + 1) * (2 * n - i - 2) // 2
+    i = np.where(k >= nxt, i + 1, i)
+    before = i * (2 * n - i - 1) // 2
+    return i, k - before + i + 1
+
+
+def scan_pairs(values, rows, cols, engine="statsmodels"):
+    """
+    Cointegration p-values of values[:, rows[k]] on values[:, cols[k]].
+
+    engine="statsmodels" calls coint() per pair (on each column's non-NaN
+    values, as find_cointegrated_pairs does); engine="batched" sends pairs of
+    clean, non-constant columns through coint_engine and the rest through
+    coint().
+
+    Returns (pvals, tstats, errors) with errors a list of (i, j, message);
+    failed pairs keep a p-value of 1.0 and a NaN statistic.
+    """
+    pvals = np.ones(len(rows))
+    tstats = np.full(len(rows), np.nan)
+    errors = []
+
+    reference = np.ones(len(rows), dtype=bool)
+    if engine == "batched":
+        clean = np.isfinite(values).all(axis=0) & (np.ptp(values, axis=0) > 0)
+        fast = clean[rows] & clean[cols]
+        if fast.any():
+            tstats[fast], pvals[fast] = batched_coint(values[:, rows[fast]], values[:, cols[fast]])
+        reference = ~fast
+    elif engine != "statsmodels":
+        raise ValueError(f"Unknown cointegration engine: {engine}")
+
+    for k in np.flatnonzero(reference):
+        i, j = rows[k], cols[k]
+        y, x = values[:, i], values[:, j]
+        try:
+            tstats[k], pvals[k], _ = coint(y[~np.isnan(y)], x[~np.isnan(x)])
+        except Exception as e:
+            errors.append((int(i), int(j), str(e)))
+    return pvals, tstats, errors
+
+
+def _chunk_pairs(n, pairs, start, stop):
+    if pairs is None:
+        return _pair_index(n, start, stop)
+    return pairs[0][start:stop], pairs[1][start:stop]
+
+
+def _scan_chunk(start, stop, engine):
+    rows, cols = _chunk_pairs(_VALUES.shape[1], _PAIRS, start, stop)
+    return (start, stop) + scan_pairs(_VALUES, rows, cols, engine=engine)
+
+
+def parallel_pvalue_matrix(values, engine="statsmodels", workers=None, chunk_size=None,
+                           rows=None, cols=None):
+    """
+    Upper-triangle cointegration p-values for all column pairs of a (T, n)
+    price matrix (or only the pairs rows[k], cols[k] if given), scanned
+    across a process pool.
+
+    The pair index space (i < j) is split into chunks of chunk_size pairs.
+    Workers attach to the price matrix through shared memory instead of
+    receiving pickled DataFrames, and each finished chunk is written into the
+    p-value matrix as soon as it comes back.
+
+    Returns (pvals, tstats, errors): (n, n) arrays with p-values (1.0
+    elsewhere) and test statistics (NaN elsewhere) above the diagonal, and a
+    list of (i, j, message) for failed pairs.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    n = values.shape[1]
+    pairs = None if rows is None else (np.asarray(rows), np.asarray(cols))
+    n_pairs = n * (n - 1) // 2 if pairs is None else len(pairs[0])
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+
+    pvals = np.ones((n, n))
+    tstats = np.full((n, n), np.nan)
+    errors = []
+    if n_pairs == 0:
+        return pvals, tstats, errors
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, values.shape, pairs)) as pool:
+            futures = [pool.submit(_scan_chunk, start, min(start + chunk_size, n_pairs), engine)
+                       for start in range(0, n_pairs, chunk_size)]
+            for future in as_completed(futures):
+                start, stop, chunk_pvals, chunk_tstats, chunk_errors = future.result()
+                i, j = _chunk_pairs(n, pairs, start, stop)
+                pvals[i, j] = chunk_pvals
+                tstats[i, j] = chunk_tstats
+                errors.extend(chunk_errors)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return pvals, tstats, errors
@@ -0,0 +1,105 @@
+import os
+import time
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from .hedge_engine import pair_hedge_ratios
+from .rolling_kernel import rolling_pair_stats
+from .signal_engine import band_signals
+from .backtest_engine import backtest_signals
+
+DEFAULT_WINDOWS = (10, 20, 40, 60)
+DEFAULT_ENTRIES = (1.0, 1.5, 2.0, 2.5)
+DEFAULT_EXITS = (0.0, 0.25, 0.5, 1.0)
+METRICS = ("n_trades", "total_pnl", "hit_rate", "sharpe", "max_drawdown", "turnover")
+
+
+def threshold_grid(entries=DEFAULT_ENTRIES, exits=DEFAULT_EXITS):
+    """(entry, exit) combinations with exit < entry."""
+    return [(e, x) for e, x in itertools.product(entries, exits) if x < e]
+
+
+def _sweep_block(y, x, windows, grid):
+    """
+    Metrics of every (window, entry, exit) setting for the pairs in the
+    (T, P) price arrays y and x. Returns a dict of (len(windows), len(grid),
+    P) arrays.
+    """
+    T, P = y.shape
+    G = len(grid)
+    _, betas = pair_hedge_ratios(y, x)
+    entry = np.repeat([e for e, _ in grid], P)
+    exit_ = np.repeat([x_ for _, x_ in grid], P)
+    y_grid, x_grid = np.tile(y, G), np.tile(x, G)
+
+    shape = (len(windows), G, P)
+    out = {k: np.zeros(shape) for k in METRICS}
+    for w, window in enumerate(windows):
+        # one pass of rolling statistics per window, shared by every threshold
+        zscore = rolling_pair_stats(y, x, betas, window=window, min_periods=1)["zscore"]
+        signals, _ = band_signals(np.tile(zscore, G), entry, exit_)
+        result = backtest_signals(signals, y_grid, x_grid)
+        result["total_pnl"] = result["pnl"].sum(axis=0)
+        for key in METRICS:
+            out[key][w] = result[key].reshape(G, P)
+    return out
+
+
+def sweep_pair_params(data, pairs, windows=DEFAULT_WINDOWS, entries=DEFAULT_ENTRIES,
+                      exits=DEFAULT_EXITS, rank_by="sharpe", workers=None, chunk_size=25):
+    """
+    Grid search of the rolling window and the generate_signals entry/exit
+    thresholds for one or more (stock1, stock2) pairs of columns in data.
+
+    Each pair is hedged with its OLS beta (as in the API); for every window
+    the z-scores of all pairs come out of one rolling_pair_stats pass, and
+    all thresholds are then signalled and backtested at once as extra
+    columns through band_signals and backtest_signals. PnL is per unit of
+    each stock, like backtest_pair. Settings with exit >= entry are
+    skipped.
+
+    With workers > 1 the pairs are split into chunks of chunk_size and swept
+    on a process pool.
+
+    Returns a DataFrame (stock1, stock2, window, entry, exit, n_trades,
+    total_pnl, hit_rate, sharpe, max_drawdown, turnover), best first by
+    rank_by (lowest first for max_drawdown).
+    """
+    if rank_by not in METRICS:
+        raise ValueError(f"rank_by must be one of {', '.join(METRICS)}")
+    grid = threshold_grid(entries, exits)
+    if not pairs or not grid:
+        return pd.DataFrame(columns=["stock1", "stock2", "window", "entry", "exit", *METRICS])
+
+    started = time.perf_counter()
+    windows = list(windows)
+    y = data[[a for a, _ in pairs]].to_numpy(dtype=float)
+    x = data[[b for _, b in pairs]].to_numpy(dtype=float)
+    chunks = [slice(start, start + chunk_size) for start in range(0, len(pairs), chunk_size)]
+
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as pool:
+            futures = [pool.submit(_sweep_block, y[:, c], x[:, c], windows, grid) for c in chunks]
+            parts = [f.result() for f in futures]
+    else:
+        parts = [_sweep_block(y[:, c], x[:, c], windows, grid) for c in chunks]
+    metrics = {k: np.concatenate([p[k] for p in parts], axis=2) for k in parts[0]}
+
+    W, G, P = metrics["sharpe"].shape
+    w_idx, g_idx, p_idx = (a.ravel() for a in np.indices((W, G, P)))
+    table = pd.DataFrame({
+        "stock1": [pairs[p][0] for p in p_idx],
+        "stock2": [pairs[p][1] for p in p_idx],
+        "window": np.asarray(windows)[w_idx],
+        "entry": [grid[g][0] for g in g_idx],
+        "exit": [grid[g][1] for g in g_idx],
+        **{k: metrics[k].ravel() for k in METRICS},
+    })
+    table["n_trades"] = table["n_trades"].astype(int)
+    table = table.sort_values(rank_by, ascending=rank_by == "max_drawdown",
+                              na_position="last", kind="stable")
+    print(f"[DEBUG] Parameter sweep: {len(table)} settings over {P} pairs "
+          f"in {time.perf_counter() - started:.3f}s")
+    return table.reset_index(drop=True)
@@ -0,0 +1,138 @@
+import time
+import heapq
+import numpy as np
+import pandas as pd
+
+from .hedge_engine import pair_hedge_ratios
+from .rolling_kernel import rolling_pair_stats
+from .signal_engine import band_signals
+from .backtest_engine import trade_positions, closed_trades, equity_metrics, _fill_forward, _last_index
+
+
+def admit_trades(pair, bar_e, bar_x, slots):
+    """
+    Which trades fit in `slots` concurrent positions, taking them by entry
+    bar (ties in pair order, so rank the pairs best first) and freeing a
+    slot on each exit bar before that bar's entries.
+    Returns a boolean array over the trades.
+    """
+    n = len(pair)
+    # fast path: check peak demand with all trades admitted
+    events = np.concatenate([bar_e, bar_x])
+    change = np.concatenate([np.ones(n, dtype=np.int64), -np.ones(n, dtype=np.int64)])
+    order = np.lexsort((change, events))
+    if n == 0 or np.cumsum(change[order]).max() <= slots:
+        return np.ones(n, dtype=bool)
+
+    admitted = np.zeros(n, dtype=bool)
+    open_exits = []
+    for k in np.lexsort((pair, bar_e)).tolist():
+        while open_exits and open_exits[0] <= bar_e[k]:
+            heapq.heappop(open_exits)
+        if len(open_exits) < slots:
+            admitted[k] = True
+            heapq.heappush(open_exits, bar_x[k])
+    return admitted
+
+
+def portfolio_backtest(data, pairs, window=20, entry=2.0, exit=0.5,
+                       capital=1000000.0, capital_per_trade=10000.0, periods_per_year=252,
+                       hedge_ratios=None, start=0):
+    """
+    Backtest a book of (stock1, stock2) pairs, e.g. from get_top_n_pairs,
+    on the shared date axis of data.
+
+    Every pair is signalled like the API (OLS hedge ratio, z-score over a
+    rolling window with min_periods=1, band_signals entry/exit) and traded
+    like simulate_pair_trading_strategy: each leg takes capital_per_trade
+    of notional at the entry prices. At most
+    capital // (2 * capital_per_trade) trades are open at once, so gross
+    exposure stays within capital; when the book is full a new trade is
+    skipped (pairs earlier in the list win ties). Positions, share counts
+    and PnL are (T, pairs) arrays; only the admission check visits trades
+    one by one, and only when the limit actually binds.
+
+    hedge_ratios (one per pair) replaces the OLS fit, e.g. with betas from
+    an earlier training window. Bars before `start` only warm up the
+    rolling window: the book starts flat and trades from bar start on.
+
+    Returns (equity, attribution, report): the portfolio equity Series, a
+    per-pair DataFrame (stock1, stock2, trades, skipped, pnl, hit_rate,
+    share of total pnl) and a dict of portfolio statistics.
+    """
+    started = time.perf_counter()
+    y = data[[a for a, _ in pairs]].to_numpy(dtype=float)
+    x = data[[b for _, b in pairs]].to_numpy(dtype=float)
+    T, P = y.shape
+    cols = np.arange(P)
+
+    if hedge_ratios is None:
+        _, hedge_ratios = pair_hedge_ratios(y, x)
+    zscore = rolling_pair_stats(y, x, np.asarray(hedge_ratios, dtype=float),
+                                window=window, min_periods=1)["zscore"]
+    signals = np.zeros((T, P), dtype=np.int8)
+    signals[start:] = band_signals(zscore[start:], entry, exit)[0]
+    wanted, entries, exits = trade_positions(signals)
+    pair, bar_e, bar_x = closed_trades(entries, exits, include_open=True)
+
+    # both legs of a trade use capital_per_trade
+    slots = int(capital // (2 * capital_per_trade))
+    admitted = admit_trades(pair, bar_e, bar_x, slots)
+    side = wanted[bar_e, pair]
+
+    # positions of the admitted trades: +side on the entry bar, -side on exit
+    delta = np.zeros((T + 1, P), dtype=np.int64)
+    np.add.at(delta, (bar_e[admitted], pair[admitted]), side[admitted])
+    np.add.at(delta, (bar_x[admitted], pair[admitted]), -side[admitted])
+    positions = np.cumsum(delta[:T], axis=0)
+
+    # shares of each leg fixed at the prices of the bar the trade opened
+    y_fill, x_fill = _fill_forward(y), _fill_forward(x)
+    opened_mark = np.zeros((T, P), dtype=bool)
+    opened_mark[bar_e[admitted], pair[admitted]] = True
+    opened = np.maximum(_last_index(opened_mark), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares_y = positions * capital_per_trade / y_fill[opened, cols]
+        shares_x = positions * capital_per_trade / x_fill[opened, cols]
+
+    pnl = np.zeros((T, P))
+    pnl[1:] = np.nan_to_num(shares_y[:-1] * np.diff(y_fill, axis=0)
+                            - shares_x[:-1] * np.diff(x_fill, axis=0))
+    book_pnl = pnl.sum(axis=1)
+    equity, max_drawdown, sharpe = equity_metrics(book_pnl, capital, periods_per_year)
+
+    cum = np.vstack([np.zeros((1, P)), np.cumsum(pnl, axis=0)])
+    done = admitted & (bar_x < T)
+    trade_pnl = cum[bar_x[done] + 1, pair[done]] - cum[bar_e[done] + 1, pair[done]]
+    n_trades = np.bincount(pair[admitted], minlength=P)
+    wins = np.bincount(pair[done], weights=trade_pnl > 0, minlength=P)
+    closed = np.bincount(pair[done], minlength=P)
+    pair_pnl = pnl.sum(axis=0)
+    total = book_pnl.sum()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        attribution = pd.DataFrame({
+            "stock1": [a for a, _ in pairs],
+            "stock2": [b for _, b in pairs],
+            "trades": n_trades,
+            "skipped": np.bincount(pair[~admitted], minlength=P),
+            "pnl": pair_pnl,
+            "hit_rate": np.where(closed > 0, wins / closed, np.nan),
+            "share": pair_pnl / total if total else np.nan,
+        })
+    open_trades = np.count_nonzero(positions, axis=1)
+    report = {
+        "pairs": P,
+        "slots": slots,
+        "trades": int(admitted.sum()),
+        "skipped": int((~admitted).sum()),
+        "max_open": int(open_trades.max()) if T else 0,
+        "final_equity": float(equity[-1]) if T else float(capital),
+        "total_pnl": float(total),
+        "max_drawdown": max_drawdown,
+        "sharpe": sharpe,
+        "seconds": time.perf_counter() - started,
+    }
+    print(f"[DEBUG] Portfolio backtest: {P} pairs, {report['trades']} trades "
+          f"({report['skipped']} skipped) in {report['seconds']:.3f}s")
+    return pd.Series(equity, index=data.index), attribution, report
@@ -0,0 +1,191 @@
+import os
+import glob
+import threading
+import numpy as np
+import pandas as pd
+
+from .alignment import align_to_frame, align_series
+from .data_loader import parse_quote_file, parse_quote_rows_after, load_quote_files, stock_name_from_path
+from .snapshot import read_snapshot, snapshot_is_fresh, append_snapshot
+
+# path -> (mtime, size, close series) for every quote file parsed so far
+_FILE_CACHE = {}
+# data_dir -> (tuple of file keys, aligned panel)
+_PANEL_CACHE = {}
+# data_dir -> (panel, values buffer, dates buffer) with spare rows for appends
+_APPEND_BUFFERS = {}
+_LOCK = threading.Lock()
+
+
+def _to_series(path, parsed):
+    if parsed is None:
+        return None
+    dates, closes = parsed
+    return pd.Series(closes, index=pd.DatetimeIndex(dates, name="date"), name=stock_name_from_path(path))
+
+
+def read_close_series(path):
+    """
+    Parse one quote CSV into a float close-price Series indexed by date.
+    Returns None if the file has no date/close columns.
+    """
+    return _to_series(path, parse_quote_file(path))
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def build_price_panel(series_list, ffill=True):
+    """
+    Outer-align close series on date into one contiguous float64
+    dates x tickers block.
+    """
+    parsed = [(s.index.values, s.to_numpy(dtype=float)) for s in series_list]
+    names = [s.name for s in series_list]
+    return align_to_frame(parsed, names, how="ffill" if ffill else "outer", index_name="date")
+
+
+def get_price_panel(data_dir, snapshot_path=None):
+    """
+    Process-wide close-price panel (dates x tickers, forward filled) for all
+    quote CSVs in data_dir.
+
+    Files are keyed by (path, mtime, size); only new or modified files are
+    re-parsed, and the panel is rebuilt only when a key changes. If
+    snapshot_path points to a compiled snapshot that is newer than every
+    CSV, the panel is opened from it instead of parsing text. The returned
+    DataFrame is shared between callers and must be treated as read-only.
+    Returns None if no valid CSVs are found.
+    """
+    if snapshot_path is not None and snapshot_is_fresh(snapshot_path, data_dir):
+        with _LOCK:
+            key = (_file_key(snapshot_path),)
+            cached = _PANEL_CACHE.get(snapshot_path)
+            if cached is None or cached[0] != key:
+                cached = (key, read_snapshot(snapshot_path))
+                _PANEL_CACHE[snapshot_path] = cached
+            return cached[1]
+
+    paths = glob.glob(os.path.join(data_dir, "*.csv"))
+
+    with _LOCK:
+        keys = tuple(_file_key(p) for p in paths)
+        cached = _PANEL_CACHE.get(data_dir)
+        if cached is not None and cached[0] == keys:
+            return cached[1]
+
+        stale = [k for k in keys if _FILE_CACHE.get(k[0], (None, None))[:2] != k[1:]]
+        parsed = load_quote_files([path for path, _, _ in stale])
+        for (path, mtime, size), result in zip(stale, parsed):
+            _FILE_CACHE[path] = (mtime, size, _to_series(path, result))
+
+        series_list = [_FILE_CACHE[path][2] for path, _, _ in keys
+                       if _FILE_CACHE[path][2] is not None]
+
+        # forget files that were removed from disk
+        prefix = os.path.join(data_dir, "")
+        for path in set(_FILE_CACHE) - set(paths):
+            if path.startswith(prefix):
+                del _FILE_CACHE[path]
+
+        panel = build_price_panel(series_list) if series_list else None
+        _PANEL_CACHE[data_dir] = (keys, panel)
+        return panel
+
+
+def _append_rows(data_dir, panel, dates, rows):
+    """
+    Append rows behind panel using spare buffer capacity, so repeated daily
+    appends cost O(new rows) amortized instead of copying the history.
+    """
+    n, m = len(panel), len(dates)
+    entry = _APPEND_BUFFERS.get(data_dir)
+    if entry is None or entry[0] is not panel or entry[1].shape[0] < n + m:
+        capacity = max(2 * n, n + m)
+        values = np.full((capacity, panel.shape[1]), np.nan)
+        values[:n] = panel.to_numpy(dtype=float)
+        index = np.empty(capacity, dtype="datetime64[ns]")
+        index[:n] = panel.index.values
+    else:
+        _, values, index = entry
+
+    values[n:n + m] = rows
+    index[n:n + m] = dates
+    new_panel = pd.DataFrame(values[:n + m], index=pd.DatetimeIndex(index[:n + m], name=panel.index.name),
+                             columns=panel.columns, copy=False)
+    _APPEND_BUFFERS[data_dir] = (new_panel, values, index)
+    return new_panel
+
+
+def append_new_bars(data_dir, snapshot_path=None):
+    """
+    End-of-day refresh: append bars newer than the cached panel's last date.
+
+    Starts from the cached panel for data_dir, or from the (possibly stale)
+    snapshot. Only files whose (mtime, size) changed are opened, and from
+    those only the rows dated after the panel's last date are parsed. The
+    rows are appended to the cached panel and, if snapshot_path is given, to
+    the snapshot. Earlier rows are assumed unchanged; if tickers were added
+    or removed this falls back to a full get_price_panel rebuild.
+
+    Returns the refreshed panel.
+    """
+    all_paths = glob.glob(os.path.join(data_dir, "*.csv"))
+    paths = [p for p in all_paths if os.path.basename(p).startswith("Quote-Equity-")]
+
+    with _LOCK:
+        keys = tuple(_file_key(p) for p in all_paths)
+        cached = _PANEL_CACHE.get(data_dir)
+        if cached is not None and cached[1] is not None:
+            base, old_keys = cached[1], set(cached[0])
+            changed = [k[0] for k in keys if k not in old_keys and k[0] in paths]
+        elif snapshot_path is not None and os.path.exists(snapshot_path):
+            base = read_snapshot(snapshot_path)
+            changed = paths
+        else:
+            base = None
+
+    names = [stock_name_from_path(p) for p in paths]
+    if base is None or sorted(names) != sorted(base.columns):
+        if base is not None:
+            print("[WARN] tickers changed since the last load; rebuilding the price panel.")
+        return get_price_panel(data_dir)
+
+    last_date = base.index[-1]
+    parsed = []
+    columns = list(base.columns)
+    for path in changed:
+        result = parse_quote_rows_after(path, last_date)
+        if result is not None and len(result[0]):
+            parsed.append((columns.index(stock_name_from_path(path)), result))
+
+    with _LOCK:
+        if parsed:
+            dates, matrix = align_series([r for _, r in parsed], how="outer")
+            raw = np.full((len(dates), len(columns)), np.nan)
+            raw[:, [j for j, _ in parsed]] = matrix
+
+            # forward fill the new rows from the panel's last row
+            filled = np.vstack([base.to_numpy(dtype=float)[-1:], raw])
+            filled = pd.DataFrame(filled).ffill().to_numpy()[1:]
+            panel = _append_rows(data_dir, base, dates, filled)
+
+            if snapshot_path is not None and os.path.exists(snapshot_path):
+                append_snapshot(snapshot_path, pd.DataFrame(raw, index=pd.DatetimeIndex(dates), columns=columns))
+        else:
+            panel = base
+
+        _PANEL_CACHE[data_dir] = (keys, panel)
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            _PANEL_CACHE[snapshot_path] = ((_file_key(snapshot_path),), panel)
+        return panel
+
+
+def clear_price_cache():
+    """Drop all cached files and panels (e.g. after replacing DATA_DIR)."""
+    with _LOCK:
+        _FILE_CACHE.clear()
+        _PANEL_CACHE.clear()
+        _APPEND_BUFFERS.clear()
@@ -0,0 +1,176 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import closing
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 200_000
+# sqlite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+# key -> (pvalue, tstat, hedge_ratio, correlation), least recently used first
+_MEMORY = OrderedDict()
+_CONFIG = {"path": None, "max_entries": DEFAULT_MAX_ENTRIES, "ready": False}
+_LOCK = threading.Lock()
+
+
+def configure_pvalue_cache(path=None, max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Set the sqlite file backing the pair-result cache (None = memory only)
+    and the LRU size used both in memory and on disk. The file is only
+    created when the first results are stored.
+    """
+    with _LOCK:
+        _CONFIG["path"] = path
+        _CONFIG["max_entries"] = max_entries
+        _CONFIG["ready"] = False
+
+
+def _disk_path(create=False):
+    """
+    The sqlite file to use, with its table set up on first use; None if the
+    cache is memory only, or if the file does not exist yet and not create.
+    """
+    with _LOCK:
+        path, ready = _CONFIG["path"], _CONFIG["ready"]
+    if path is None or ready:
+        return path
+    if not create and not os.path.exists(path):
+        return None
+    try:
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pair_results ("
+                "key TEXT PRIMARY KEY, pvalue REAL, tstat REAL, "
+                "hedge_ratio REAL, correlation REAL, last_used REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pair_results_lru ON pair_results(last_used)")
+    except sqlite3.Error as e:
+        print(f"[WARN] p-value cache disabled on disk ({path}): {e}")
+        with _LOCK:
+            _CONFIG["path"] = None
+        return None
+    with _LOCK:
+        _CONFIG["ready"] = True
+    return path
+
+
+def column_fingerprints(data):
+    """Content hash of every column of data, including its dates."""
+    index_bytes = np.asarray(data.index.values).tobytes()
+    values = data.to_numpy(dtype=np.float64)
+    fingerprints = []
+    for j in range(values.shape[1]):
+        h = hashlib.blake2b(index_bytes, digest_size=16)
+        h.update(np.ascontiguousarray(values[:, j]).tobytes())
+        fingerprints.append(h.hexdigest())
+    return fingerprints
+
+
+def pair_keys(data, rows, cols, fingerprints=None):
+    """
+    Cache keys for testing column rows[k] on cols[k]: both tickers (in test
+    order), the date range and the content hash of both series.
+    """
+    if fingerprints is None:
+        fingerprints = column_fingerprints(data)
+    if len(data.index):
+        date_range = f"{data.index[0]}|{data.index[-1]}"
+    else:
+        date_range = "|"
+    columns = data.columns
+    return [f"{columns[i]}|{columns[j]}|{date_range}|{fingerprints[i]}|{fingerprints[j]}"
+            for i, j in zip(rows, cols)]
+
+
+def _evict_memory():
+    while len(_MEMORY) > _CONFIG["max_entries"]:
+        _MEMORY.popitem(last=False)
+
+
+def lookup_pair_results(keys):
+    """
+    Return {key: (pvalue, tstat, hedge_ratio, correlation)} for every cached
+    key, checking memory first and then disk.
+    """
+    found = {}
+    with _LOCK:
+        for key in keys:
+            entry = _MEMORY.get(key)
+            if entry is not None:
+                _MEMORY.move_to_end(key)
+                found[key] = entry
+
+    missing = [k for k in keys if k not in found]
+    path = _disk_path() if missing else None
+    if path is None:
+        return found
+
+    try:
+        with closing(sqlite3.connect(path)) as conn, conn:
+            for start in range(0, len(missing), _SQL_BATCH):
+                batch = missing[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    "SELECT key, pvalue, tstat, hedge_ratio, correlation "
+                    f"FROM pair_results WHERE key IN ({marks})", batch
+                ).fetchall()
+                now = time.time()
+                conn.executemany("UPDATE pair_results SET last_used = ? WHERE key = ?",
+                                 [(now, r[0]) for r in rows])
+                for r in rows:
+                    found[r[0]] = tuple(np.nan if v is None else v for v in r[1:])
+    except sqlite3.Error as e:
+        print(f"[WARN] p-value cache lookup failed: {e}")
+
+    with _LOCK:
+        for key in missing:
+            if key in found:
+                _MEMORY[key] = found[key]
+        _evict_memory()
+    return found
+
+
+def store_pair_results(results):
+    """Cache {key: (pvalue, tstat, hedge_ratio, correlation)} in memory and on disk."""
+    if not results:
+        return
+    with _LOCK:
+        for key, entry in results.items():
+            _MEMORY[key] = entry
+            _MEMORY.move_to_end(key)
+        _evict_memory()
+        max_entries = _CONFIG["max_entries"]
+
+    path = _disk_path(create=True)
+    if path is None:
+        return
+    now = time.time()
+    try:
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pair_results VALUES (?, ?, ?, ?, ?, ?)",
+                [(k,) + tuple(None if np.isnan(v) else float(v) for v in entry) + (now,)
+                 for k, entry in results.items()],
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM pair_results").fetchone()[0] - max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM pair_results WHERE key IN "
+                    "(SELECT key FROM pair_results ORDER BY last_used LIMIT ?)", (excess,)
+                )
+    except sqlite3.Error as e:
+        print(f"[WARN] p-value cache store failed: {e}")
+
+
+def clear_pvalue_cache(disk=False):
+    """Drop the in-memory cache, and the on-disk entries too if disk=True."""
+    with _LOCK:
+        _MEMORY.clear()
+    path = _disk_path() if disk else None
+    if path is not None:
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute("DELETE FROM pair_results")
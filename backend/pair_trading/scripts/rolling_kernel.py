@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_columns(a):
+    a = np.asarray(a, dtype=np.float64)
+    return a[:, None] if a.ndim == 1 else a
+
+
+def window_sums(a, window):
+    """
+    Sum of each column of a (T, k) array over the last `window` rows
+    (fewer at the start).
+
+    Rows are cut into blocks of `window`; every window is a suffix of one
+    block plus a prefix of the next, so each sum adds at most `window`
+    terms and nothing is ever subtracted: no drift or cancellation however
+    long the series, unlike add/remove running sums.
+    """
+    T, k = a.shape
+    if T == 0:
+        return a.copy()
+    pad = (-T) % window
+    blocks = np.concatenate([a, np.zeros((pad, k))]).reshape(-1, window, k)
+    prefix = np.cumsum(blocks, axis=1).reshape(-1, k)[:T]
+    suffix = np.cumsum(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1, k)[:T]
+
+    t = np.arange(T)
+    start = t - window + 1
+    spans_two = (start >= 0) & (t % window != window - 1)
+    out = prefix
+    out[spans_two] += suffix[start[spans_two]]
+    return out
+
+
+def _constant_run(a):
+    """Length of the run of identical values ending at each row (NaN breaks runs)."""
+    T = a.shape[0]
+    t = np.arange(T)[:, None]
+    same = np.zeros(a.shape, dtype=bool)
+    same[1:] = a[1:] == a[:-1]
+    last_change = np.maximum.accumulate(np.where(same, 0, t), axis=0)
+    return t - last_change + 1
+
+
+def _variance(sq, s, n, run):
+    """Sample variance (ddof=1) from centred window sums; exactly 0 for constant windows."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.maximum(sq - s * s / n, 0.0) / (n - 1)
+    var = np.where(run >= n, 0.0, var)
+    return np.where(n >= 2, var, np.nan)
+
+
+def rolling_pair_stats(y, x, hedge_ratio=None, spread=None, window=20, min_periods=1):
+    """
+    Fused rolling statistics for one or many pairs: spread = y - hedge_ratio
+    * x (or a precomputed spread), its rolling mean and std (ddof=1), the
+    z-score (spread - mean) / std, and the rolling correlation of y and x.
+
+    y and x are (T,) or (T, pairs) arrays; hedge_ratio a scalar, one value
+    per pair or one per bar. All window sums (count, spread, y, x and their
+    squares and cross product) come out of one window_sums call on
+    centred data. Windows with fewer than min_periods observations are NaN,
+    like pandas rolling(window, min_periods); with min_periods=1 the
+    statistics start on the first bar.
+
+    Returns a dict of arrays shaped like y: spread, mean, std, zscore, corr.
+    """
+    squeeze = np.ndim(y) == 1
+    y, x = _as_columns(y), _as_columns(x)
+    if spread is None:
+        spread = y - np.asarray(hedge_ratio, dtype=np.float64) * x
+    spread = np.broadcast_to(_as_columns(spread), y.shape)
+
+    s_mask = np.isfinite(spread)
+    p_mask = np.isfinite(y) & np.isfinite(x)
+
+    def centred(a, mask):
+        centre = np.where(mask, a, 0.0).sum(axis=0) / np.maximum(mask.sum(axis=0), 1)
+        return np.where(mask, a - centre, 0.0), centre
+
+    sc, s_centre = centred(spread, s_mask)
+    yc, _ = centred(y, p_mask)
+    xc, _ = centred(x, p_mask)
+
+    sums = window_sums(np.hstack([
+        s_mask, sc, sc * sc,
+        p_mask, yc, xc, yc * yc, xc * xc, yc * xc,
+    ]).astype(np.float64), window)
+    n_s, s1, s2, n_p, sy, sx, syy, sxx, sxy = np.split(sums, 9, axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s1 / n_s
+        var = _variance(s2, s1, n_s, _constant_run(np.where(s_mask, spread, np.nan)))
+        std = np.sqrt(var)
+        zscore = (spread - (mean + s_centre)) / std
+        mean = mean + s_centre
+
+        var_y = _variance(syy, sy, n_p, _constant_run(np.where(p_mask, y, np.nan)))
+        var_x = _variance(sxx, sx, n_p, _constant_run(np.where(p_mask, x, np.nan)))
+        cov = (sxy - sx * sy / n_p) / (n_p - 1)
+        corr = np.clip(cov / np.sqrt(var_y * var_x), -1.0, 1.0)
+        corr = np.where((var_y > 0) & (var_x > 0), corr, np.nan)
+
+    too_few_s = n_s < max(min_periods, 1)
+    too_few_p = n_p < max(min_periods, 1)
+    out = {
+        "spread": np.array(spread),
+        "mean": np.where(too_few_s, np.nan, mean),
+        "std": np.where(too_few_s, np.nan, std),
+        "zscore": np.where(too_few_s | ~s_mask, np.nan, zscore),
+        "corr": np.where(too_few_p, np.nan, corr),
+    }
+    if squeeze:
+        return {k: v[:, 0] for k, v in out.items()}
+    return out
+
+
+def rolling_mean_std(series, window, min_periods=None):
+    """
+    rolling(window, min_periods).mean() and .std() of a Series through
+    rolling_pair_stats; min_periods defaults to window like pandas.
+    """
+    min_periods = window if min_periods is None else min_periods
+    values = np.asarray(series, dtype=np.float64)
+    stats = rolling_pair_stats(values, values, spread=values, window=window, min_periods=min_periods)
+    return (pd.Series(stats["mean"], index=series.index),
+            pd.Series(stats["std"], index=series.index))
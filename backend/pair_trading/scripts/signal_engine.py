@@ -0,0 +1,122 @@
+import numpy as np
+
+# Integer signal codes (int8), one per bar and pair
+SIGNAL_NONE = 0
+SIGNAL_LONG = 1     # buy the spread: buy y, sell x
+SIGNAL_SHORT = 2    # sell the spread: sell y, buy x
+SIGNAL_EXIT = 3
+
+# Labels used by generate_signals and the API
+SIGNAL_LABELS = (None, "BUY_Y_SELL_X", "SELL_Y_BUY_X", "EXIT")
+
+
+def _as_columns(zscore):
+    z = np.asarray(zscore, dtype=np.float64)
+    return (z[:, None], True) if z.ndim == 1 else (z, False)
+
+
+def _signals_from_positions(positions):
+    """Code every bar on which the position changes by the position it moves to."""
+    previous = np.vstack([np.zeros((1, positions.shape[1]), dtype=np.int8), positions[:-1]])
+    signals = np.full(positions.shape, SIGNAL_NONE, dtype=np.int8)
+    changed = positions != previous
+    signals[changed & (positions == 1)] = SIGNAL_LONG
+    signals[changed & (positions == -1)] = SIGNAL_SHORT
+    signals[changed & (positions == 0)] = SIGNAL_EXIT
+    return signals
+
+
+def band_signals(zscore, entry=2.0, exit=0.5):
+    """
+    Entry/exit hysteresis of generate_signals for a (T,) or (T, pairs)
+    z-score array: short the spread when z > entry, long when z < -entry
+    (reversing directly if already in the other position), flat once
+    |z| < exit. NaN z-scores change nothing.
+
+    Each bar's position is set by the most recent of those three events, so
+    it is a forward fill of event positions rather than a loop over bars.
+
+    Returns (signals, positions): int8 arrays shaped like zscore, with
+    signal codes (SIGNAL_*) and the position held after each bar
+    (1 long spread, -1 short spread, 0 flat).
+    """
+    z, squeeze = _as_columns(zscore)
+    T, P = z.shape
+
+    event = np.zeros((T, P), dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        event[z > entry] = -1
+        event[z < -entry] = 1
+        has_event = (z > entry) | (z < -entry) | (np.abs(z) < exit)
+
+    last = np.where(has_event, np.arange(T)[:, None], -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+    positions = np.where(last >= 0, event[np.maximum(last, 0), np.arange(P)], 0).astype(np.int8)
+
+    signals = _signals_from_positions(positions)
+    if squeeze:
+        return signals[:, 0], positions[:, 0]
+    return signals, positions
+
+
+def _next_index(condition):
+    """[t, p] = first s >= t with condition[s, p], or T; one extra row of T."""
+    T = condition.shape[0]
+    nxt = np.where(condition, np.arange(T)[:, None], T)
+    nxt = np.minimum.accumulate(nxt[::-1], axis=0)[::-1]
+    return np.vstack([nxt, np.full((1, condition.shape[1]), T)])
+
+
+def crossing_signals(zscore, threshold=1.0):
+    """
+    Entry/exit state machine of signal_generator for a (T,) or (T, pairs)
+    z-score array: from flat, short the spread when z > threshold and long
+    when z < -threshold; a short closes once z < 0 and a long once z > 0,
+    and a new trade can open from the next bar on.
+
+    The first bar of each event type at or after every bar is precomputed,
+    so the state machine jumps from trade to trade: one vectorized step per
+    trade across all pairs, instead of one Python step per bar.
+
+    Returns (signals, positions) like band_signals.
+    """
+    z, squeeze = _as_columns(zscore)
+    T, P = z.shape
+    with np.errstate(invalid="ignore"):
+        next_entry = _next_index(np.abs(z) > threshold)
+        next_below = _next_index(z < 0)
+        next_above = _next_index(z > 0)
+
+    delta = np.zeros((T + 1, P), dtype=np.int8)
+    cols = np.arange(P)
+    cursor = np.zeros(P, dtype=np.int64)
+    while True:
+        entry = next_entry[np.minimum(cursor, T), cols]
+        live = entry < T
+        if not live.any():
+            break
+        e, c = entry[live], cols[live]
+        side = np.where(z[e, c] > threshold, -1, 1).astype(np.int8)
+        after = np.minimum(e + 1, T)
+        exit_ = np.where(side < 0, next_below[after, c], next_above[after, c])
+        delta[e, c] += side
+        delta[exit_, c] -= side        # row T absorbs trades still open at the end
+        cursor[live] = exit_ + 1
+        cursor[~live] = T
+
+    positions = np.cumsum(delta[:T], axis=0, dtype=np.int8)
+    signals = _signals_from_positions(positions)
+    if squeeze:
+        return signals[:, 0], positions[:, 0]
+    return signals, positions
+
+
+def signal_labels(signals):
+    """String labels (SIGNAL_LABELS) for a 1-D array of signal codes."""
+    return [SIGNAL_LABELS[c] for c in np.asarray(signals).tolist()]
+
+
+def signal_codes(labels):
+    """int8 signal codes for a list of SIGNAL_LABELS strings (inverse of signal_labels)."""
+    lookup = {label: code for code, label in enumerate(SIGNAL_LABELS)}
+    return np.array([lookup[label] for label in labels], dtype=np.int8)
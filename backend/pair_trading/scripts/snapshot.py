@@ -0,0 +1,100 @@
+import os
+import glob
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+SNAPSHOT_NAME = "it_stocks.arrow"
+
+
+def _panel_table(panel, dtype):
+    values = np.asarray(panel.to_numpy(dtype=dtype))
+    columns = [pa.array(pd.DatetimeIndex(panel.index).values.astype("datetime64[ns]"))]
+    columns += [pa.array(values[:, i]) for i in range(values.shape[1])]
+    names = ["date"] + [str(c) for c in panel.columns]
+
+    metadata = {"tickers": json.dumps(names[1:]), "dtype": str(np.dtype(dtype))}
+    return pa.Table.from_arrays(columns, names=names).replace_schema_metadata(metadata)
+
+
+def write_snapshot(panel, path, dtype="float64"):
+    """
+    Write a dates x tickers close-price panel as an uncompressed Arrow IPC
+    file: one timestamp column "date" plus one float64/float32 column per
+    ticker. The ticker order is also kept in the schema metadata.
+    """
+    table = _panel_table(panel, dtype)
+
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def append_snapshot(path, rows):
+    """
+    Append new dated rows (same tickers, same order) to an existing snapshot.
+
+    The existing record batches are copied from the memory map as-is and the
+    new rows are added as one more batch, so nothing is parsed or re-aligned.
+    """
+    tmp_path = path + ".tmp"
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        schema = reader.schema
+        if schema.names[1:] != [str(c) for c in rows.columns]:
+            raise ValueError("Snapshot tickers do not match the appended rows")
+
+        dtype = schema.metadata.get(b"dtype", b"float64").decode()
+        new_rows = _panel_table(rows, dtype).replace_schema_metadata(schema.metadata)
+
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                for i in range(reader.num_record_batches):
+                    writer.write_batch(reader.get_batch(i))
+                writer.write_table(new_rows.cast(schema))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path, how="outer", ffill=True, index_name="date"):
+    """
+    Open a snapshot written by write_snapshot through a memory map.
+
+    how="outer" keeps every date (forward filled if ffill=True),
+    how="inner" keeps only dates where every ticker has a price.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    dates = pd.DatetimeIndex(table.column(0).to_numpy(), name=index_name)
+    tickers = table.column_names[1:]
+    if table.num_columns > 1:
+        values = np.column_stack([table.column(i).to_numpy() for i in range(1, table.num_columns)])
+    else:
+        values = np.empty((table.num_rows, 0))
+
+    panel = pd.DataFrame(values, index=dates, columns=tickers)
+    if how == "inner":
+        panel = panel.dropna(how="any")
+    elif ffill:
+        panel = panel.ffill()
+    return panel
+
+
+def snapshot_is_fresh(path, data_dir):
+    """
+    True if the snapshot exists and is newer than every quote CSV in data_dir.
+    """
+    if not os.path.exists(path):
+        return False
+    snap_mtime = os.stat(path).st_mtime_ns
+    for f in glob.glob(os.path.join(data_dir, "Quote-Equity-*.csv")):
+        if os.stat(f).st_mtime_ns > snap_mtime:
+            return False
+    return True
+
+
+def default_snapshot_path(data_dir):
+    return os.path.join(data_dir, SNAPSHOT_NAME)
@@ -0,0 +1,99 @@
+import json
+import numpy as np
+import pandas as pd
+
+from .signal_engine import signal_codes
+from .backtest_engine import backtest_signals
+
+# One fixed-size record per trade (57 bytes); side 1 = bought stock1 and
+# sold stock2 (BUY_Y_SELL_X), -1 = the reverse
+TRADE_DTYPE = np.dtype([
+    ("date_entry", "datetime64[D]"),
+    ("date_exit", "datetime64[D]"),
+    ("side", np.int8),
+    ("entry_y", np.float64),
+    ("entry_x", np.float64),
+    ("exit_y", np.float64),
+    ("exit_x", np.float64),
+    ("pnl", np.float64),
+])
+
+_PRICE_FIELDS = ("entry_y", "entry_x", "exit_y", "exit_x", "pnl")
+
+
+def pair_trade_records(y_prices, x_prices, signals, dates):
+    """
+    Closed trades of generate_signals labels on one pair as a TRADE_DTYPE
+    structured array: enter on BUY_Y_SELL_X / SELL_Y_BUY_X when flat, close
+    on EXIT (bars from backtest_signals), pnl per unit of each stock as
+    backtest_pair has always reported it.
+    """
+    if not len(signals):
+        return np.zeros(0, dtype=TRADE_DTYPE)
+    y_prices = np.asarray(y_prices, dtype=np.float64)
+    x_prices = np.asarray(x_prices, dtype=np.float64)
+    result = backtest_signals(signal_codes(signals), y_prices, x_prices)
+    _, entries, exits = result["trades"]
+
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    days = dates.values.astype("datetime64[D]")
+
+    records = np.zeros(len(entries), dtype=TRADE_DTYPE)
+    records["date_entry"] = days[entries]
+    records["date_exit"] = days[exits]
+    records["side"] = result["positions"][entries]
+    records["entry_y"], records["entry_x"] = y_prices[entries], x_prices[entries]
+    records["exit_y"], records["exit_x"] = y_prices[exits], x_prices[exits]
+    # PnL calculation remains same
+    records["pnl"] = np.where(records["side"] == 1,
+                              (records["exit_y"] - records["entry_y"]) - (records["exit_x"] - records["entry_x"]),
+                              (records["entry_y"] - records["exit_y"]) + (records["entry_x"] - records["exit_x"]))
+    return records
+
+
+def records_to_rows(records, stock1, stock2):
+    """The list-of-dicts trade format of backtest_pair."""
+    long = (records["side"] == 1).tolist()
+    columns = [np.datetime_as_string(records["date_entry"]).tolist(),
+               np.datetime_as_string(records["date_exit"]).tolist(), long]
+    columns += [records[field].tolist() for field in _PRICE_FIELDS]
+    return [{
+        "date_entry": d_entry,
+        "date_exit": d_exit,
+        "stock_buy": stock1 if is_long else stock2,
+        "stock_sell": stock2 if is_long else stock1,
+        "entry_y": ey,
+        "entry_x": ex,
+        "exit_y": xy,
+        "exit_x": xx,
+        "pnl": pnl
+    } for d_entry, d_exit, is_long, ey, ex, xy, xx, pnl in zip(*columns)]
+
+
+def _json_numbers(values):
+    """JSON array body of a float column; NaN and infinities become null."""
+    text = ",".join(map(repr, values.tolist()))
+    if not np.isfinite(values).all():
+        text = ",".join("null" if v in ("nan", "inf", "-inf") else v for v in text.split(","))
+    return text
+
+
+def records_to_json(records, stock1, stock2):
+    """
+    Column-oriented JSON object of a trade-record array: one array per
+    field instead of one object per trade, with the stock names given once
+    and side as 1 (bought stock1) / -1. Each column is one join over its
+    array, with no per-trade dicts for a generic encoder to walk.
+    """
+    dates = {field: '","'.join(np.datetime_as_string(records[field]).tolist())
+             for field in ("date_entry", "date_exit")}
+    parts = [
+        f'"format":"columns","stock1":{json.dumps(stock1)},'
+        f'"stock2":{json.dumps(stock2)},"n":{len(records)}',
+        *(f'"{field}":["{dates[field]}"]' if len(records) else f'"{field}":[]' for field in dates),
+        f'"side":[{",".join(map(str, records["side"].tolist()))}]',
+        *(f'"{field}":[{_json_numbers(records[field])}]' for field in _PRICE_FIELDS),
+    ]
+    return "{" + ",".join(parts) + "}"
@@ -1,39 +1,103 @@
-def simulate_pair_trading_strategy(signal_df, stock1, stock2, capital=100000, capital_per_trade=10000):
-    position = None
-    entry_prices = {}
-    trade_log = []
-    final_capital = capital
-
-    for date, row in signal_df.iterrows():
-        s1_price = row[stock1]
-        s2_price = row[stock2]
-
-        if position is None:
-            if row['Buy Signal']:
-                position = 'long'
-                entry_prices = {stock1: s1_price, stock2: s2_price}
-                trade_log.append(f"Buy {stock1} at ₹{s1_price:.2f}, Sell {stock2} at ₹{s2_price:.2f}")
-            elif row['Sell Signal']:
-                position = 'short'
-                entry_prices = {stock1: s1_price, stock2: s2_price}
-                trade_log.append(f"Sell {stock1} at ₹{s1_price:.2f}, Buy {stock2} at ₹{s2_price:.2f}")
-
-        elif row['Exit Signal'] and position:
-            exit_prices = {stock1: s1_price, stock2: s2_price}
-            if position == 'long':
-                profit = (exit_prices[stock1] - entry_prices[stock1]) * (capital_per_trade / entry_prices[stock1]) \
-                       - (exit_prices[stock2] - entry_prices[stock2]) * (capital_per_trade / entry_prices[stock2])
-            else:  # short
-                profit = (entry_prices[stock1] - exit_prices[stock1]) * (capital_per_trade / entry_prices[stock1]) \
-                       - (entry_prices[stock2] - exit_prices[stock2]) * (capital_per_trade / entry_prices[stock2])
-            
-            final_capital += profit
-            trade_log.append(f"Exit: Spread reverted to mean on {date.strftime('%Y-%m-%d')}, Profit: ₹{profit:.2f}")
-            position = None
-            entry_prices = {}
-
-    trade_log.append(f"\nFinal Capital: ₹{final_capital:.2f}")
-    for line in trade_log:
-        print(line)
+import numpy as np
+
+from .signal_engine import SIGNAL_NONE, SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_EXIT
+from .backtest_engine import trade_positions, closed_trades
+
+
+def _signal_codes(buy, sell, exit_):
+    """
+    Signal codes for the Buy/Sell/Exit Signal columns. A bar flagged both
+    for entry and exit is an exit while a trade is open and an entry when
+    flat, so such bars are settled front to back (there are usually none).
+    """
+    codes = np.select([buy, sell, exit_], [SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_EXIT],
+                      SIGNAL_NONE).astype(np.int8)
+    both = np.flatnonzero((buy | sell) & exit_)
+    entry_codes = codes[both]
+    settled = 0
+    while settled < len(both):
+        positions, _, _ = trade_positions(codes)
+        held = np.concatenate([[0], positions[:-1]])[both[settled:]] != 0
+        want = np.where(held, SIGNAL_EXIT, entry_codes[settled:])
+        wrong = np.flatnonzero(codes[both[settled:]] != want)
+        if not len(wrong):
+            break
+        # only the first mismatch is certain; later bars depend on it
+        k = settled + wrong[0]
+        codes[both[k]] = want[wrong[0]]
+        settled = k + 1
+    return codes
+
+
+def pair_trade_table(signal_df, stock1, stock2, capital_per_trade=10000):
+    """
+    Trades of simulate_pair_trading_strategy as columns: when flat a Buy
+    Signal opens a long (buy stock1, sell stock2) and a Sell Signal a short,
+    an Exit Signal closes the open trade, and each leg is sized at
+    capital_per_trade of notional at the entry prices.
+
+    Returns a dict of arrays: entry and exit (row positions, exit = -1 for
+    a trade still open at the end), side (1 long, -1 short), the entry and
+    exit prices of both stocks (NaN exits if open) and profit (NaN if open).
+    """
+    codes = _signal_codes(signal_df['Buy Signal'].to_numpy(dtype=bool),
+                          signal_df['Sell Signal'].to_numpy(dtype=bool),
+                          signal_df['Exit Signal'].to_numpy(dtype=bool))
+    positions, entries, exits = trade_positions(codes)
+    _, entry, exit_ = closed_trades(entries, exits, include_open=True)
+    closed = exit_ < len(codes)
+    exit_ = np.where(closed, exit_, -1)
+
+    p1 = signal_df[stock1].to_numpy(dtype=float)
+    p2 = signal_df[stock2].to_numpy(dtype=float)
+    side = positions[entry].astype(np.int64)
+    entry1, entry2 = p1[entry], p2[entry]
+    exit1 = np.where(closed, p1[exit_], np.nan)
+    exit2 = np.where(closed, p2[exit_], np.nan)
+    long_profit = (exit1 - entry1) * (capital_per_trade / entry1) \
+                - (exit2 - entry2) * (capital_per_trade / entry2)
+    short_profit = (entry1 - exit1) * (capital_per_trade / entry1) \
+                 - (entry2 - exit2) * (capital_per_trade / entry2)
+    return {
+        "entry": entry,
+        "exit": exit_,
+        "side": side,
+        "entry1": entry1,
+        "entry2": entry2,
+        "exit1": exit1,
+        "exit2": exit2,
+        "profit": np.where(side == 1, long_profit, short_profit),
+    }
+
+
+def trade_log_lines(trades, dates, stock1, stock2, final_capital):
+    """Text log of a pair_trade_table, generated line by line on demand."""
+    for k in range(len(trades["entry"])):
+        s1_price, s2_price = trades["entry1"][k], trades["entry2"][k]
+        if trades["side"][k] == 1:
+            yield f"Buy {stock1} at ₹{s1_price:.2f}, Sell {stock2} at ₹{s2_price:.2f}"
+        else:
+            yield f"Sell {stock1} at ₹{s1_price:.2f}, Buy {stock2} at ₹{s2_price:.2f}"
+        if trades["exit"][k] >= 0:
+            date = dates[trades["exit"][k]]
+            yield f"Exit: Spread reverted to mean on {date.strftime('%Y-%m-%d')}, Profit: ₹{trades['profit'][k]:.2f}"
+    yield f"\nFinal Capital: ₹{final_capital:.2f}"
+
+
+def simulate_pair_trading_strategy(signal_df, stock1, stock2, capital=100000, capital_per_trade=10000,
+                                   verbose=True):
+    """
+    Trade the Buy/Sell/Exit Signal columns of calculate_rolling_strategy and
+    return the final capital. Trades are found with array operations
+    (pair_trade_table); the text log is only formatted when verbose.
+    """
+    trades = pair_trade_table(signal_df, stock1, stock2, capital_per_trade)
+    profits = trades["profit"][trades["exit"] >= 0]
+    # running sum in trade order, like adding the profits one by one
+    final_capital = float(np.cumsum(np.concatenate([[capital], profits]))[-1])
+
+    if verbose:
+        for line in trade_log_lines(trades, signal_df.index, stock1, stock2, final_capital):
+            print(line)
 
     return final_capital
@@ -0,0 +1,162 @@
+import os
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from .cointegration_utils import find_cointegrated_pairs
+from .pair_selection import get_top_n_pairs
+from .hedge_engine import pair_hedge_ratios
+from .param_sweep import sweep_pair_params, DEFAULT_WINDOWS, DEFAULT_ENTRIES, DEFAULT_EXITS
+from .portfolio_backtest import portfolio_backtest
+from .pvalue_cache import column_fingerprints
+
+DEFAULT_TRAIN = 120
+DEFAULT_TEST = 20
+
+
+def walk_forward_folds(n_rows, train=DEFAULT_TRAIN, test=DEFAULT_TEST):
+    """(train_start, test_start, test_stop) row positions of consecutive folds."""
+    return [(start, start + train, min(start + train + test, n_rows))
+            for start in range(0, n_rows - train, test)]
+
+
+def _fold_key(data, params):
+    """Content hash of a slice of data and the parameters applied to it."""
+    h = hashlib.blake2b(repr(params).encode(), digest_size=16)
+    for fingerprint in column_fingerprints(data):
+        h.update(fingerprint.encode())
+    h.update("|".join(map(str, data.columns)).encode())
+    return h.hexdigest()
+
+
+def _cached(cache_dir, name, compute):
+    """Load cache_dir/name.pkl, or compute and store it; returns (value, hit)."""
+    path = os.path.join(cache_dir, f"{name}.pkl") if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            return pd.read_pickle(path), True
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable walk-forward cache {path}: {e}")
+    value = compute()
+    if path:
+        pd.to_pickle(value, path)
+    return value, False
+
+
+def _train_fold(train, top_n, significance, windows, entries, exits, rank_by):
+    """Pair selection and threshold choice on one training window."""
+    _, pval_matrix = find_cointegrated_pairs(train, significance=significance, engine="batched")
+    ranked = get_top_n_pairs(train, pval_matrix, n=top_n)
+    pairs = [(a, b) for a, b, *_ in ranked]
+    setting = (20, 2.0, 0.5)
+    sweep = None
+    hedge_ratios = np.array([])
+    if pairs:
+        _, hedge_ratios = pair_hedge_ratios(train[[a for a, _ in pairs]].to_numpy(dtype=float),
+                                            train[[b for _, b in pairs]].to_numpy(dtype=float))
+        sweep = sweep_pair_params(train, pairs, windows, entries, exits, rank_by=rank_by)
+        # one setting for the whole book: best average over the selected pairs
+        means = sweep.groupby(["window", "entry", "exit"])[rank_by].mean().dropna()
+        if len(means):
+            best = means.idxmin() if rank_by == "max_drawdown" else means.idxmax()
+            setting = (int(best[0]), float(best[1]), float(best[2]))
+    return {
+        "pval_matrix": pval_matrix,
+        "pairs": pairs,
+        "hedge_ratios": hedge_ratios,
+        "sweep": sweep,
+        "setting": setting,
+    }
+
+
+def _run_fold(fold_data, train_len, params, cache_dir):
+    """
+    One walk-forward job: select on fold_data[:train_len], trade the rest.
+    Training results and test PnL are cached separately, keyed by the data
+    they were computed from, so a rerun, or a run with a different capital
+    setup, reuses them.
+    """
+    train = fold_data.iloc[:train_len]
+    selection_params = {k: params[k] for k in ("top_n", "significance", "windows",
+                                               "entries", "exits", "rank_by")}
+    train_key = _fold_key(train, selection_params)
+    selected, train_hit = _cached(cache_dir, f"train-{train_key}", lambda: _train_fold(
+        train, **selection_params))
+
+    def trade():
+        if not selected["pairs"]:
+            return pd.Series(0.0, index=fold_data.index[train_len:])
+        window, entry, exit_ = selected["setting"]
+        equity, _, _ = portfolio_backtest(
+            fold_data, selected["pairs"], window=window, entry=entry, exit=exit_,
+            capital=params["capital"], capital_per_trade=params["capital_per_trade"],
+            hedge_ratios=selected["hedge_ratios"], start=train_len)
+        return equity.diff().fillna(0.0).iloc[train_len:]
+
+    test_key = _fold_key(fold_data, (train_key, params["capital"], params["capital_per_trade"]))
+    pnl, test_hit = _cached(cache_dir, f"test-{test_key}", trade)
+    return selected, pnl, train_hit and test_hit
+
+
+def walk_forward(data, train=DEFAULT_TRAIN, test=DEFAULT_TEST, top_n=10, significance=0.05,
+                 windows=DEFAULT_WINDOWS, entries=DEFAULT_ENTRIES, exits=DEFAULT_EXITS,
+                 rank_by="sharpe", capital=1000000.0, capital_per_trade=10000.0,
+                 workers=None, cache_dir=None):
+    """
+    Walk-forward optimisation: on each training window of `train` rows pick
+    the top_n cointegrated pairs (find_cointegrated_pairs + get_top_n_pairs)
+    and the (window, entry, exit) setting that scores best on them
+    (sweep_pair_params, averaged over the pairs), then trade that book with
+    portfolio_backtest on the next `test` rows, with the training hedge
+    ratios and the training tail as rolling-window warm-up. Folds then roll
+    forward by `test` rows.
+
+    Folds are independent jobs, run on a process pool when workers > 1.
+    With cache_dir set, each fold's training results (p-value matrix,
+    selected pairs, sweep table, hedge ratios) and test PnL are pickled
+    there, keyed by a hash of the rows and parameters they depend on.
+
+    Returns (equity, folds): the out-of-sample equity Series over all test
+    rows, starting from capital, and a DataFrame with one row per fold.
+    Positions still open at the end of a fold are valued at its last bar.
+    """
+    started = time.perf_counter()
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    params = {
+        "top_n": top_n, "significance": significance, "windows": tuple(windows),
+        "entries": tuple(entries), "exits": tuple(exits), "rank_by": rank_by,
+        "capital": capital, "capital_per_trade": capital_per_trade,
+    }
+    folds = walk_forward_folds(len(data), train, test)
+    jobs = [(data.iloc[a:c], b - a, params, cache_dir) for a, b, c in folds]
+
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as pool:
+            futures = [pool.submit(_run_fold, *job) for job in jobs]
+            results = [f.result() for f in futures]
+    else:
+        results = [_run_fold(*job) for job in jobs]
+
+    rows = []
+    for (a, b, c), (selected, pnl, cached) in zip(folds, results):
+        window, entry, exit_ = selected["setting"]
+        rows.append({
+            "train_start": data.index[a],
+            "test_start": data.index[b],
+            "test_end": data.index[c - 1],
+            "pairs": selected["pairs"],
+            "window": window,
+            "entry": entry,
+            "exit": exit_,
+            "pnl": float(pnl.sum()),
+            "cached": cached,
+        })
+
+    pnl = pd.concat([r[1] for r in results]) if results else pd.Series(dtype=float)
+    equity = capital + pnl.cumsum()
+    print(f"[DEBUG] Walk-forward: {len(folds)} folds, {len(pnl)} out-of-sample bars "
+          f"in {time.perf_counter() - started:.3f}s")
+    return equity, pd.DataFrame(rows)